@@ -322,3 +322,17 @@ class ConversationalResponseAgent:
             return "unsure_or_declined"
 
         return "unclassified"
+
+
+# ---------------------------------------------------------------------
+# ♻️ Shared instance (webhooks reuse one OpenAI client / connection pool)
+# ---------------------------------------------------------------------
+_shared_agent: Optional[ConversationalResponseAgent] = None
+
+
+def get_conversational_agent() -> ConversationalResponseAgent:
+    """Lazily create and cache the process-wide ConversationalResponseAgent."""
+    global _shared_agent
+    if _shared_agent is None:
+        _shared_agent = ConversationalResponseAgent()
+    return _shared_agent
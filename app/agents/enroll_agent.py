@@ -67,20 +67,20 @@ def enroll_contact_into_campaign(sb, org_id, contact_id, campaign_id, reason="sw
 # --------------------------------------------
 # 2️⃣ Simulated follow-up message generator
 # --------------------------------------------
+# Per-channel message patterns; only per-lead fields are filled in per call.
+_FOLLOWUP_TEMPLATES = {
+    "sms": "Hi {name}, just checking if you had a chance to look at our program options!",
+    "email": "Subject: Let's stay in touch\n\nHi {name}, we’d love to help you get started with your application.",
+    "voice": "This is a reminder call for {name} about program enrollment options.",
+}
+_FOLLOWUP_DEFAULT = "Hello {name}, this is your follow-up from our admissions team."
+
+
 @activity.defn
 async def generate_followup_message(lead: dict) -> str:
     """
     Generate a simulated follow-up message based on channel type.
     Used by SimulatedFollowupWorkflow.
     """
-    name = lead.get("name", "there")
-    channel = lead.get("next_channel", "sms")
-
-    if channel == "sms":
-        return f"Hi {name}, just checking if you had a chance to look at our program options!"
-    elif channel == "email":
-        return f"Subject: Let's stay in touch\n\nHi {name}, we’d love to help you get started with your application."
-    elif channel == "voice":
-        return f"This is a reminder call for {name} about program enrollment options."
-    else:
-        return f"Hello {name}, this is your follow-up from our admissions team."
+    template = _FOLLOWUP_TEMPLATES.get(lead.get("next_channel", "sms"), _FOLLOWUP_DEFAULT)
+    return template.format_map({"name": lead.get("name", "there")})
@@ -2,14 +2,32 @@
 import os, asyncpg
 
 _DSN = os.getenv("DATABASE_URL")
+# Prepared statements cached per connection (asyncpg default is 100)
+_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "1024"))
+# Warm connections kept open vs. hard cap; idle extras are closed after 60s
+_POOL_MIN = int(os.getenv("DB_POOL_MIN", "10"))
+_POOL_MAX = int(os.getenv("DB_POOL_MAX", "25"))
+_POOL_MAX_INACTIVE_SECONDS = float(os.getenv("DB_POOL_MAX_INACTIVE_SECONDS", "60"))
 _pool = None
 
 async def init_db_pool():
     global _pool
     if _pool is None:
-        _pool = await asyncpg.create_pool(dsn=_DSN, min_size=1, max_size=5)
+        _pool = await asyncpg.create_pool(
+            dsn=_DSN,
+            min_size=min(_POOL_MIN, _POOL_MAX),
+            max_size=_POOL_MAX,
+            max_inactive_connection_lifetime=_POOL_MAX_INACTIVE_SECONDS,
+            statement_cache_size=_STATEMENT_CACHE_SIZE,
+        )
     return _pool
 
+async def close_db_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
 async def run_query(sql: str, *args):
     pool = _pool or await init_db_pool()
     async with pool.acquire() as conn:
@@ -1,7 +1,11 @@
 # app/data/supabase_repo.py
 from __future__ import annotations
+import asyncio
 import os, json, httpx
+import orjson
+import uuid
 from typing import Optional, Dict, Any
+from dataclasses import dataclass
 from datetime import datetime
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from temporalio import activity
@@ -67,6 +71,27 @@ class TransientError(Exception):
     """Raised for transient HTTP/network errors that should trigger retry."""
 
 
+def _encode(json_body: Any) -> bytes:
+    """Serialize a request body once (orjson); sent as content= with the JSON Content-Type header."""
+    return orjson.dumps(json_body, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Shared keep-alive REST client, reused across calls instead of a fresh
+# connection (TCP + TLS handshake) per request. Bound to the event loop that
+# created it; a different running loop (e.g. a new asyncio.run) gets its own.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_loop = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _http_client, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_loop is not loop or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=15)
+        _http_loop = loop
+    return _http_client
+
+
 def _raise_if_transient(status: int, detail: str = ""):
     if status in (429, 500, 502, 503, 504):
         raise TransientError(detail)
@@ -76,27 +101,37 @@ def _raise_if_transient(status: int, detail: str = ""):
 #  REST Helpers
 # ===============================================================
 
-async def insert(table: str, json_body: dict):
-    """Insert record(s) into a Supabase table."""
+async def insert(
+    table: str,
+    json_body: dict | list,
+    client: Optional[httpx.AsyncClient] = None,
+    on_conflict: Optional[str] = None,
+):
+    """
+    Insert record(s) into a Supabase table (a list body is one bulk INSERT).
+    With on_conflict, rows clashing on those columns are skipped, so a retried
+    insert of the same rows is a no-op.
+    """
     url, key, _ = _cfg()
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            f"{url}/rest/v1/{table}",
-            headers={**_headers(key), "Prefer": "return=representation"},
-            json=json_body,
-        )
-        _raise_if_transient(r.status_code, r.text)
-        r.raise_for_status()
-        return r.json()
+    full_url = f"{url}/rest/v1/{table}"
+    headers = {**_headers(key), "Prefer": "return=representation"}
+    if on_conflict:
+        full_url += f"?on_conflict={on_conflict}"
+        headers["Prefer"] = "resolution=ignore-duplicates,return=representation"
+    content = _encode(json_body)
+    r = await (client or _http()).post(full_url, headers=headers, content=content)
+    _raise_if_transient(r.status_code, r.text)
+    r.raise_for_status()
+    return r.json()
 
 
-async def patch(table: str, query: str, json_body: dict):
-    """Perform PATCH on Supabase table."""
+async def patch(table: str, query: str, json_body: dict, client: Optional[httpx.AsyncClient] = None):
+    """Perform PATCH on Supabase table (optionally on a caller-owned client)."""
     url, key, schema = _cfg()
     full_url = f"{url}/rest/v1/{table}?{query}"
     headers = {**_headers(key), "Accept-Profile": schema, "Prefer": "return=representation"}
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.patch(full_url, json=json_body, headers=headers)
+    content = _encode(json_body)
+    r = await (client or _http()).patch(full_url, content=content, headers=headers)
     _raise_if_transient(r.status_code, r.text)
     return r
 
@@ -145,11 +180,10 @@ class SupabaseRepo:
         This replaces the old get_call_transcript() that queried lead_campaign_steps.
         """
         url, key, schema = _cfg()
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                f"{url}/rest/v1/message?provider_ref=eq.{provider_ref}&select=content,transcript,status",
-                headers={**_headers(key), "Accept-Profile": schema},
-            )
+        r = await _http().get(
+            f"{url}/rest/v1/message?provider_ref=eq.{provider_ref}&select=content,transcript,status",
+            headers={**_headers(key), "Accept-Profile": schema},
+        )
         if r.status_code == 200 and r.json():
             return r.json()[0]
         return {}
@@ -250,31 +284,140 @@ def rpc(name: str, payload: dict | None = None):
 
 async def rpc_async(name: str, payload: dict | None = None):
     url, key, schema = _cfg()
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.post(
-            f"{url}/rest/v1/rpc/{name}",
-            headers={**_headers(key), "Accept-Profile": schema},
-            json=payload or {},
-        )
-        _raise_if_transient(r.status_code, r.text)
-        r.raise_for_status()
-        return r.json()
+    r = await _http().post(
+        f"{url}/rest/v1/rpc/{name}",
+        headers={**_headers(key), "Accept-Profile": schema},
+        json=payload or {},
+    )
+    _raise_if_transient(r.status_code, r.text)
+    r.raise_for_status()
+    return r.json()
+
+
+# ===============================================================
+#  Interactions
+# ===============================================================
+
+def _interaction_row(
+    enrollment_id: str,
+    channel: str,
+    direction: str,
+    status: str,
+    content: Optional[str],
+    message_type: str,
+    classification: Optional[dict] = None,
+) -> dict:
+    return {
+        "enrollment_id": enrollment_id,
+        "channel": channel.lower(),
+        "direction": direction.lower(),
+        "status": status,
+        "content": content or "",
+        "message_type": message_type,
+        "classification": classification or {},
+    }
+
+
+@dataclass
+class FollowupFinalizeInput:
+    enrollment_id: str
+    channel: str
+    outbound_message: str
+    inbound_message: Optional[str]
+    now_iso: str
+    workflow_id: Optional[str] = None
 
 
 # ===============================================================
 #  Temporal Activity Wrappers
 # ===============================================================
 
+def _normalize_ts(v):
+    """Normalize one datetime / ISO string for Supabase; other values pass through."""
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, str) and "T" in v:
+        return v.replace("T", " ").replace("Z", "")
+    return v
+
+
+def _normalize_timestamps(json_body: dict) -> dict:
+    """Normalize datetimes for Supabase (in place)."""
+    for k, v in json_body.items():
+        json_body[k] = _normalize_ts(v)
+    return json_body
+
+
+# Constant part of the enrollment patch written after a follow-up cycle
+_FOLLOWUP_ENROLLMENT_PATCH = {"status": "active"}
+
+# Namespace for the deterministic interaction ids written by finalize_followup
+_FOLLOWUP_ID_NAMESPACE = uuid.UUID("6f1c2b1e-4d0a-4c53-9a57-2f3e8d9b7c10")
+
+
+def _followup_interaction_id(data: FollowupFinalizeInput, direction: str) -> str:
+    """Same id on every attempt of one follow-up cycle (workflow id + workflow time)."""
+    name = f"{data.workflow_id}:{data.enrollment_id}:{data.now_iso}:{direction}"
+    return str(uuid.uuid5(_FOLLOWUP_ID_NAMESPACE, name))
+
+
+@activity.defn
+async def insert_interaction(
+    enrollment_id: str,
+    channel: str,
+    direction: str = "outbound",
+    status: str = "completed",
+    content: Optional[str] = None,
+    message_type: str = "system_message",
+    classification: Optional[dict] = None,
+):
+    """Insert one row into interactions."""
+    row = _interaction_row(enrollment_id, channel, direction, status, content, message_type, classification)
+    return await insert("interactions", row)
+
+
+@activity.defn
+async def finalize_followup(data: FollowupFinalizeInput):
+    """
+    Record a simulated follow-up cycle in one activity task:
+    one bulk INSERT of the outbound (+ optional inbound) interactions and
+    one PATCH of campaign_enrollments, over the shared keep-alive client.
+
+    Rows carry deterministic ids and duplicates are ignored, so a retry after
+    the INSERT committed (e.g. the PATCH failed or timed out) adds no rows.
+    """
+    rows = [
+        {
+            "id": _followup_interaction_id(data, "outbound"),
+            **_interaction_row(data.enrollment_id, data.channel, "outbound", "completed", data.outbound_message, "ai_generated"),
+        }
+    ]
+    if data.inbound_message is not None:
+        rows.append(
+            {
+                "id": _followup_interaction_id(data, "inbound"),
+                **_interaction_row(data.enrollment_id, data.channel, "inbound", "completed", data.inbound_message, "user_reply"),
+            }
+        )
+    ts = _normalize_ts(data.now_iso)  # one timestamp, formatted once
+    fields = {**_FOLLOWUP_ENROLLMENT_PATCH, "last_contacted_at": ts, "updated_at": ts}
+    try:
+        inserted = await insert("interactions", rows, on_conflict="id")
+        r = await patch("campaign_enrollments", f"id=eq.{data.enrollment_id}", fields)
+        if r.status_code >= 400:
+            print(f"[FINALIZE_FOLLOWUP_ERROR] {r.status_code}: {r.text}")
+            r.raise_for_status()
+        return {"interactions": len(inserted or []), "status": r.status_code}
+    except Exception as e:
+        print(f"[FINALIZE_FOLLOWUP_EXCEPTION] {type(e).__name__}: {e}")
+        raise
+
+
 @activity.defn
 async def patch_activity(table: str, query: str, json_body: dict):
     """Temporal-safe wrapper for Supabase patch."""
     try:
-        # Normalize datetimes for Supabase
-        for k, v in json_body.items():
-            if isinstance(v, datetime):
-                json_body[k] = v.strftime("%Y-%m-%d %H:%M:%S")
-            elif isinstance(v, str) and "T" in v:
-                json_body[k] = v.replace("T", " ").replace("Z", "")
+        _normalize_timestamps(json_body)
 
         print(f"[PATCH_ACTIVITY] {table}?{query} => {json.dumps(json_body)}")
         r = await patch(table, query, json_body)
@@ -24,6 +24,16 @@ from temporalio import activity
 
 from app.agents.appointment_scheduler_agent import AppointmentSchedulerAgent
 
+# One agent (and its Supabase client) per worker process instead of per activity call.
+_AGENT: Optional[AppointmentSchedulerAgent] = None
+
+
+def _get_agent() -> AppointmentSchedulerAgent:
+    global _AGENT
+    if _AGENT is None:
+        _AGENT = AppointmentSchedulerAgent()
+    return _AGENT
+
 
 def _parse_iso_datetime(value: Optional[str]) -> datetime:
     """
@@ -86,9 +96,7 @@ async def book_appointment_activity(payload: Dict[str, Any]) -> Dict[str, Any]:
         source,
     )
 
-    agent = AppointmentSchedulerAgent()
-
-    result = await agent.schedule_from_enrollment(
+    result = await _get_agent().schedule_from_enrollment(
         enrollment_id=enrollment_id,
         registration_id=registration_id,
         scheduled_for=scheduled_for,
@@ -6,6 +6,7 @@ from app.channels.providers import email as email_client
 from app.data import supabase_repo as repo
 from app.policy.guards import evaluate_policy_guards
 from app.policy.guards_budget import evaluate_budget_caps
+from app.policy import counters
 from app.data.telemetry import log_decision_to_audit  # optional
 from app.data.db import supabase  # your db helper in app/data/db.py
 
@@ -107,6 +108,7 @@ async def email_send(enrollment_id: str, payload: Dict[str, Any]) -> Dict[str, A
             )
         except Exception as log_ex:
             logger.warning("OutboundLogFailed", extra={"error": str(log_ex)})
+        await counters.incr_sent(lead.get("id"), channel)
 
         logger.info(
             "EmailDispatched",
@@ -64,7 +64,7 @@ except Exception:
 # ---------------------------------------------
 # Rules engine
 # ---------------------------------------------
-from app.policy.matching_dsl import evaluate_ruleset
+from app.policy.matching_dsl import compile_ruleset_cached, evaluate_ruleset
 
 # ---------------------------------------------
 # Supabase REST config (HTTPS/443)
@@ -422,7 +422,8 @@ async def deterministic_score(params: Dict[str, Any]) -> Dict[str, Any]:
         fingerprint = hashlib.sha256(fp_src.encode()).hexdigest()[:32]
         rules = await _rest_select_rules_by_version(rules_version)
         raw_scores, gaps = evaluate_ruleset(
-            {**lead, "zip": zipc, "interest": interest}, [dict(r) for r in (rules or [])]
+            {**lead, "zip": zipc, "interest": interest},
+            compile_ruleset_cached(rules_version, [dict(r) for r in (rules or [])]),
         )
         norm_scores = await _normalize_scores_to_ids(raw_scores, use_rest=True)
         return {"scores": norm_scores, "gaps": gaps, "fingerprint": fingerprint}
@@ -469,7 +470,8 @@ async def deterministic_score(params: Dict[str, Any]) -> Dict[str, Any]:
         )
 
     raw_scores, gaps = evaluate_ruleset(
-        {**lead, "zip": zipc, "interest": interest}, [dict(r) for r in (rules or [])]
+        {**lead, "zip": zipc, "interest": interest},
+        compile_ruleset_cached(rules_version, [dict(r) for r in (rules or [])]),
     )
     norm_scores = await _normalize_scores_to_ids(raw_scores, use_rest=False)
     return {"scores": norm_scores, "gaps": gaps, "fingerprint": fingerprint}
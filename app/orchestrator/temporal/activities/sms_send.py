@@ -6,6 +6,7 @@ from app.channels.providers import sms as sms_client
 from app.data import supabase_repo as repo
 from app.policy.guards import evaluate_policy_guards
 from app.policy.guards_budget import evaluate_budget_caps
+from app.policy import counters
 from app.data.telemetry import log_decision_to_audit
 from app.data.db import supabase  # async supabase accessor
 
@@ -81,6 +82,7 @@ async def sms_send(enrollment_id: str, payload: Dict[str, Any]) -> Dict[str, Any
             await repo.log_outbound(enrollment_id, channel, provider_ref)
         except Exception as ex:
             activity.logger.warning(f"⚠️ Failed to log outbound SMS: {ex}")
+        await counters.incr_sent(lead.get("id"), channel)
 
         activity.logger.info(
             f"✅ SMS dispatched successfully | to={to} ref={provider_ref}"
@@ -7,6 +7,7 @@ from app.agents.voice_conversation_agent import VoiceConversationAgent
 from app.data.supabase_repo import SupabaseRepo
 from app.policy.guards import evaluate_policy_guards
 from app.policy.guards_budget import evaluate_budget_caps
+from app.policy import counters
 from app.data.telemetry import log_decision_to_audit
 from app.data.db import supabase  # consistent with other activities
 
@@ -97,6 +98,7 @@ async def voice_start(enrollment_id: str, payload: Dict[str, Any]) -> Dict[str,
             vars=payload.get("context", {}),
             simulate=simulate,
         )
+        await counters.incr_sent(lead.get("id"), channel)
 
         # Combine result and return structured data
         logger.info(
@@ -0,0 +1,71 @@
+# app/orchestrator/temporal/common/converter.py
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, Optional, Type
+
+import orjson
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import (
+    AdvancedJSONEncoder,
+    CompositePayloadConverter,
+    DataConverter,
+    DefaultPayloadConverter,
+    JSONPlainPayloadConverter,
+    value_to_type,
+)
+
+# -----------------------------------------------------------------------------
+# orjson-backed "json/plain" converter
+# -----------------------------------------------------------------------------
+# Wire-compatible with Temporal's default JSON converter (same encoding name,
+# compact JSON), so clients/workers using the stock converter can still read
+# these payloads. orjson serializes dataclasses in C, skipping the reflective
+# dataclasses.asdict() walk done by AdvancedJSONEncoder.
+
+_ORJSON_OPTS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+_FALLBACK_ENCODER = AdvancedJSONEncoder()
+
+
+def _default(value: Any) -> Any:
+    """Fallback for types orjson does not know (iterables, objects with dict())."""
+    return _FALLBACK_ENCODER.default(value)
+
+
+class OrjsonPlainPayloadConverter(JSONPlainPayloadConverter):
+    """Drop-in replacement for JSONPlainPayloadConverter using orjson."""
+
+    def to_payload(self, value: Any) -> Optional[Payload]:
+        return Payload(
+            metadata={"encoding": self.encoding.encode()},
+            data=orjson.dumps(value, default=_default, option=_ORJSON_OPTS),
+        )
+
+    def from_payload(self, payload: Payload, type_hint: Optional[Type] = None) -> Any:
+        try:
+            obj = orjson.loads(payload.data)
+        except orjson.JSONDecodeError as err:
+            raise RuntimeError("Failed parsing") from err
+        if type_hint:
+            obj = value_to_type(type_hint, obj, self._custom_type_converters)
+        return obj
+
+
+class OrjsonPayloadConverter(CompositePayloadConverter):
+    """Default converter chain with the JSON step swapped for orjson."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            *(
+                OrjsonPlainPayloadConverter()
+                if isinstance(c, JSONPlainPayloadConverter)
+                else c
+                for c in DefaultPayloadConverter.default_encoding_payload_converters
+            )
+        )
+
+
+# Pass as Client.connect(..., data_converter=data_converter)
+data_converter = dataclasses.replace(
+    DataConverter.default, payload_converter_class=OrjsonPayloadConverter
+)
@@ -11,4 +11,8 @@ TEMPORAL_NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
 TASK_QUEUE = os.getenv("TEMPORAL_TASK_QUEUE", "cory-handoff-queue")
 
 # === C5.1 additions ===
-AI_MATCH_QUEUE = "ai-match-q" # task queue for program/persona matching
\ No newline at end of file
+AI_MATCH_QUEUE = "ai-match-q" # task queue for program/persona matching
+
+# Simulated follow-up workflows, and the rate-limited LLM activity they call
+SIMULATED_QUEUE = os.getenv("SIMULATED_QUEUE", "cory-simulated")
+LLM_QUEUE = os.getenv("LLM_QUEUE", "cory-llm")
@@ -12,6 +12,7 @@ from pydantic import BaseModel, Field
 from temporalio.client import Client
 from temporalio.common import WorkflowIDReusePolicy
 
+from app.orchestrator.temporal.workflows import workflow_registry
 from app.orchestrator.temporal.workflows.handoff import HandoffWorkflow
 from app.orchestrator.temporal.workflows.answer_builder import AnswerWorkflow
 
@@ -26,12 +27,10 @@ app = FastAPI(title="Temporal Signal Bridge", version="1.0")
 
 
 async def get_temporal_client() -> Client:
-    """Establish a connection to the Temporal server."""
+    """Return the process-wide Temporal client (connected on first use)."""
     target = os.getenv("TEMPORAL_TARGET", "localhost:7233")
-    namespace = os.getenv("TEMPORAL_NAMESPACE", "default")
     try:
-        client = await Client.connect(target, namespace=namespace)
-        return client
+        return await workflow_registry.get_client()
     except Exception as e:  # noqa: BLE001
         logger.exception("❌ Failed to connect to Temporal at %s: %s", target, e)
         raise HTTPException(status_code=503, detail=f"Temporal unavailable: {e}")
@@ -64,11 +63,9 @@ async def signal_workflow(
         "ANSWER_BUILDER_WORKFLOW_ID",
         "answer-builder-00000000-0000-0000-0000-000000000042",
     )
-    target = os.getenv("TEMPORAL_TARGET", "localhost:7233")
-    namespace = os.getenv("TEMPORAL_NAMESPACE", "default")
 
     try:
-        client = await Client.connect(target, namespace=namespace)
+        client = await workflow_registry.get_client()
 
         # ✅ Handle both Twilio-style and lowercase field styles
         body_text = (
@@ -164,17 +161,11 @@ async def send_handoff_resolve_signal(
     client: Optional[Client] = None,
 ) -> None:
     """Send a resolve signal to HandoffWorkflow."""
-    owned_client = False
     if client is None:
         client = await get_temporal_client()
-        owned_client = True
-    try:
-        handle = client.get_workflow_handle(workflow_id)
-        await handle.signal(HandoffWorkflow.resolve, resolution_payload or {})
-        logger.info("📨 Sent resolve signal to handoff workflow %s", workflow_id)
-    finally:
-        if owned_client:
-            await client.close()
+    handle = client.get_workflow_handle(workflow_id)
+    await handle.signal(HandoffWorkflow.resolve, resolution_payload or {})
+    logger.info("📨 Sent resolve signal to handoff workflow %s", workflow_id)
 
 
 # --------------------------------------------------------------------------
@@ -5,19 +5,23 @@ import logging
 import os
 import signal
 import sys
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv, find_dotenv
 from temporalio.client import Client
 from temporalio.worker import Worker
 from app.common.tracing import setup_logging
+from app.orchestrator.temporal.common.converter import data_converter
 
 # Workflows
 from app.orchestrator.temporal.workflows.answer_builder import AnswerWorkflow
 from app.orchestrator.temporal.workflows.campaign import CampaignWorkflow
 from app.orchestrator.temporal.workflows.handoff import HandoffWorkflow
 from app.orchestrator.temporal.workflows.program_match import ProgramMatchWf
-from app.orchestrator.temporal.workflows.simulated_followup import SimulatedFollowupWorkflow
+from app.orchestrator.temporal.workflows.simulated_followup import (
+    BatchSimulatedFollowupWorkflow,
+    SimulatedFollowupWorkflow,
+)
 from app.orchestrator.temporal.workflows.followup_callback import CallbackFollowupWorkflow
 from app.orchestrator.temporal.workflows.book_appointment_workflow import BookAppointmentWorkflow
 
@@ -59,6 +63,8 @@ try:
         TASK_QUEUE as _CFG_TASK_QUEUE,
         AI_MATCH_QUEUE as _CFG_AI_MATCH_QUEUE,
         RAG_QUEUE as _CFG_RAG_QUEUE,
+        SIMULATED_QUEUE as _CFG_SIMULATED_QUEUE,
+        LLM_QUEUE as _CFG_LLM_QUEUE,
     )
 
     TEMPORAL_TARGET = _CFG_TARGET
@@ -66,6 +72,8 @@ try:
     TASK_QUEUE = _CFG_TASK_QUEUE
     AI_MATCH_QUEUE = _CFG_AI_MATCH_QUEUE
     RAG_QUEUE = _CFG_RAG_QUEUE
+    SIMULATED_QUEUE = _CFG_SIMULATED_QUEUE
+    LLM_QUEUE = _CFG_LLM_QUEUE
 
 except Exception:
     TEMPORAL_TARGET = os.getenv("TEMPORAL_TARGET", "127.0.0.1:7233")
@@ -73,6 +81,27 @@ except Exception:
     TASK_QUEUE = os.getenv("TEMPORAL_TASK_QUEUE", "cory-campaigns")
     AI_MATCH_QUEUE = os.getenv("AI_MATCH_QUEUE", "ai-match-q")
     RAG_QUEUE = os.getenv("RAG_QUEUE", "rag-q")
+    SIMULATED_QUEUE = os.getenv("SIMULATED_QUEUE", "cory-simulated")
+    LLM_QUEUE = os.getenv("LLM_QUEUE", "cory-llm")
+
+# Bulkhead sizing: few expensive LLM activities at once on their own queue
+LLM_MAX_CONCURRENT_ACTIVITIES = int(os.getenv("LLM_MAX_CONCURRENT_ACTIVITIES", "10"))
+
+
+def build_worker_options() -> Dict[str, Any]:
+    """Default Worker concurrency limits, shared by every queue (env-overridable)."""
+    opts: Dict[str, Any] = {
+        "max_concurrent_workflow_tasks": int(
+            os.getenv("TEMPORAL_MAX_CONCURRENT_WORKFLOW_TASKS", "64")
+        ),
+        "max_concurrent_activities": int(
+            os.getenv("TEMPORAL_MAX_CONCURRENT_ACTIVITIES", "100")
+        ),
+    }
+    per_second = os.getenv("TEMPORAL_MAX_ACTIVITIES_PER_SECOND")
+    if per_second:
+        opts["max_activities_per_second"] = float(per_second)
+    return opts
 
 # --------------------------------------------------------------------------
 # Helper Functions
@@ -101,7 +130,9 @@ async def _connect_temporal(
                 attempt,
                 retries,
             )
-            client = await Client.connect(target, namespace=namespace)
+            client = await Client.connect(
+                target, namespace=namespace, data_converter=data_converter
+            )
             log.info("Connected to Temporal server: %s", target)
             return client
         except Exception as e:
@@ -116,19 +147,25 @@ async def _serve_queue(
     queue_name: str,
     workflows: List,
     activities: List,
+    max_concurrent_activities: Optional[int] = None,
 ) -> None:
     """Start and run a Temporal worker for a given queue."""
+    worker_kwargs = build_worker_options()
+    if max_concurrent_activities:
+        worker_kwargs["max_concurrent_activities"] = max_concurrent_activities
     log.info(
-        "🚀 Starting worker | queue=%s | workflows=%d | activities=%d",
+        "🚀 Starting worker | queue=%s | workflows=%d | activities=%d | options=%s",
         queue_name,
         len(workflows),
         len(activities),
+        worker_kwargs,
     )
     worker = Worker(
         client=client,
         task_queue=queue_name,
         workflows=workflows,
         activities=activities,
+        **worker_kwargs,
     )
     try:
         await worker.run()
@@ -205,10 +242,13 @@ async def run() -> None:
     ]
 
     # ✅ Dedicated follow-up worker group (simulated follow-up campaign)
-    followup_workflows = [SimulatedFollowupWorkflow]
+    followup_workflows = [SimulatedFollowupWorkflow, BatchSimulatedFollowupWorkflow]
     followup_activities = [
-        repo.insert_interaction,
-        repo.patch_activity,
+        repo.finalize_followup,  # run as a local activity by the workflow
+    ]
+
+    # ✅ Slow, rate-limited LLM generations on their own queue
+    llm_activities = [
         generate_followup_message,
     ]
 
@@ -227,17 +267,28 @@ async def run() -> None:
             name="rag",
         ),
         asyncio.create_task(
-            _serve_queue(client, "followup-q", followup_workflows, followup_activities),
+            _serve_queue(client, SIMULATED_QUEUE, followup_workflows, followup_activities),
             name="followup",
         ),
+        asyncio.create_task(
+            _serve_queue(
+                client,
+                LLM_QUEUE,
+                [],
+                llm_activities,
+                max_concurrent_activities=LLM_MAX_CONCURRENT_ACTIVITIES,
+            ),
+            name="llm",
+        ),
     ]
 
     log.info(
-        "✅ Worker queues initialized: campaigns=%s, ai-match=%s, rag=%s, followup=%s",
+        "✅ Worker queues initialized: campaigns=%s, ai-match=%s, rag=%s, followup=%s, llm=%s",
         TASK_QUEUE,
         AI_MATCH_QUEUE,
         RAG_QUEUE,
-        "followup-q",
+        SIMULATED_QUEUE,
+        LLM_QUEUE,
     )
 
     for t in worker_tasks:
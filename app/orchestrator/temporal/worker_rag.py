@@ -6,6 +6,8 @@ from temporalio.client import Client
 from temporalio.worker import Worker
 from dotenv import load_dotenv, find_dotenv
 
+from app.orchestrator.temporal.common.converter import data_converter
+
 # Load environment variables
 load_dotenv(find_dotenv(usecwd=True), override=False)
 
@@ -31,7 +33,9 @@ async def main():
     task_queue = os.getenv("TEMPORAL_TASK_QUEUE", "rag-q")
 
     log.info("Connecting to Temporal | target=%s | namespace=%s", temporal_target, temporal_namespace)
-    client = await Client.connect(temporal_target, namespace=temporal_namespace)
+    client = await Client.connect(
+        temporal_target, namespace=temporal_namespace, data_converter=data_converter
+    )
 
     log.info("Starting RAG worker on queue: %s", task_queue)
     log.info("Registered workflows: AnswerBuilderWf, AnswerWorkflow")
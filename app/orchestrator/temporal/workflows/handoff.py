@@ -2,12 +2,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Mapping
 from datetime import timedelta
 from temporalio import workflow
 
 from app.common.tracing import set_trace_id  # (optional for future, not required here)
-from datetime import timedelta
 
 with workflow.unsafe.imports_passed_through():
     from app.orchestrator.temporal.activities.handoff_create import (
@@ -16,6 +15,9 @@ with workflow.unsafe.imports_passed_through():
         mark_timed_out,
     )
 
+# Shared start_to_close for the short handoff DB activities (built once, not per replay)
+_ACT_TIMEOUT = timedelta(seconds=20)
+
 # -------- Types --------
 @dataclass
 class HandoffInput:
@@ -35,6 +37,14 @@ class HandoffResult:
     resolution_payload: Dict[str, Any]
 
 
+def _header_trace_id(headers: Optional[Mapping[str, Any]]) -> Optional[str]:
+    """Start header trace_id (str key -> Payload), decoded with the workflow's payload converter."""
+    raw = (headers or {}).get("trace_id")
+    if raw is None:
+        return None
+    return workflow.payload_converter().from_payload(raw, str) or None
+
+
 # -------- Workflow --------
 @workflow.defn
 class HandoffWorkflow:
@@ -54,38 +64,30 @@ class HandoffWorkflow:
         by: Optional[str] = None,
         trace_id: Optional[str] = None,              # NEW: allow trace in signal
     ) -> None:
-        payload = resolution_payload or {}
-        merged = {**payload}
+        # kept sync: pure state assignment, no coroutine scheduled per delivery
+        if self._resolved:
+            return
+        merged = {**(resolution_payload or {})}
         if decision is not None:
             merged["decision"] = decision
         if by is not None:
             merged["by"] = by
         if trace_id:
             self._trace_id = trace_id                # capture from signal if provided
-
-        if not self._resolved:
-            self._resolved = True
-            self._resolution_payload = merged
-            self._log.info("Signal 'resolve' received: %s", self._resolution_payload)
-        else:
-            self._log.info("Signal 'resolve' received again; ignoring (already resolved).")
+        self._resolution_payload = merged
+        self._resolved = True
+        self._log.info("Signal 'resolve' received: %s", merged)
 
     @workflow.run
     async def run(self, data: HandoffInput) -> HandoffResult:
-        # 🧩 extract trace_id from start headers (Temporal header values are bytes)
-        start_headers = workflow.info().headers or {}
-        if b"trace_id" in start_headers:
-            try:
-                self._trace_id = start_headers[b"trace_id"].decode("utf-8", "ignore")
-            except Exception:
-                self._trace_id = None
+        # 🧩 extract trace_id from start headers (Temporal header values are Payloads)
+        self._trace_id = _header_trace_id(workflow.info().headers)
 
         # NEW: fallback to input payload for older SDKs
-        if not self._trace_id:
-            try:
-                self._trace_id = (data.payload or {}).get("trace_id")
-            except Exception:
-                self._trace_id = None
+        if not self._trace_id and data.payload:
+            self._trace_id = data.payload.get("trace_id")
+
+        timeout_td = timedelta(seconds=data.timeout_seconds)
 
         self._log.info(
             "HandoffWorkflow start | run_id=%s subject=%s channel=%s timeout=%ss org=%s trace=%s",
@@ -97,30 +99,38 @@ class HandoffWorkflow:
         if self._trace_id:
             act_headers = {b"trace_id": self._trace_id.encode("utf-8")}
 
+        # only copy the payload when there is a trace_id to add to the body
+        payload = data.payload or {}
+        if self._trace_id:
+            payload = {**payload, "trace_id": self._trace_id}
+
         self._handoff_id = await workflow.execute_activity(
             create_handoff,
             {
                 "workflow_run_id": data.workflow_run_id,
                 "subject": data.subject,
                 "channel": data.channel,
-                "payload": {**(data.payload or {}), "trace_id": self._trace_id},  # also in body
+                "payload": payload,
                 "timeout_seconds": data.timeout_seconds,
                 "created_by": data.created_by,
                 "assignee": data.assignee,
                 "organization_id": data.organization_id,
             },
-            start_to_close_timeout=workflow.timedelta(seconds=20),
+            start_to_close_timeout=_ACT_TIMEOUT,
             # headers=act_headers,  # <-- carry trace
         )
         self._log.info("Created handoff_id=%s", self._handoff_id)
 
-        timeout_td = timedelta(seconds=data.timeout_seconds)
         self._log.info("Waiting for resolve up to %s", timeout_td)
 
-        resolved = await workflow.wait_condition(lambda: self._resolved, timeout=timeout_td)
-        if not resolved and self._resolved:
-            # defensive guard (kept from your working version)
+        if self._resolved:
+            # signal landed while create_handoff was running; skip the timer entirely
             resolved = True
+        else:
+            resolved = await workflow.wait_condition(lambda: self._resolved, timeout=timeout_td)
+            if not resolved and self._resolved:
+                # defensive guard (kept from your working version)
+                resolved = True
 
         if resolved:
             self._log.info("Resolved before timeout; applying resolution via RPC")
@@ -130,7 +140,7 @@ class HandoffWorkflow:
                     "handoff_id": self._handoff_id,
                     "resolution_payload": {**self._resolution_payload, "trace_id": self._trace_id},
                 },
-                start_to_close_timeout=workflow.timedelta(seconds=20),
+                start_to_close_timeout=_ACT_TIMEOUT,
                 # headers=act_headers,
             )
             outcome = "resolved"
@@ -139,7 +149,7 @@ class HandoffWorkflow:
             await workflow.execute_activity(
                 mark_timed_out,
                 {"handoff_id": self._handoff_id, "trace_id": self._trace_id},
-                start_to_close_timeout=workflow.timedelta(seconds=20),
+                start_to_close_timeout=_ACT_TIMEOUT,
                 # headers=act_headers,
             )
             outcome = "timed_out"
@@ -9,17 +9,94 @@ Runs a simulated outreach cycle fully within Temporal.
 - Each communication is logged to Supabase (interactions table)
 - Optional simulated inbound replies
 - Workflow progress is visible in Temporal UI
+- BatchSimulatedFollowupWorkflow runs many leads per workflow (bounded
+  concurrency, continue-as-new every BATCH_MAX leads) and reports the ids
+  of leads that failed
 """
 
-from datetime import timedelta, datetime, timezone
+import asyncio
+from datetime import timedelta
 from temporalio import workflow
 from temporalio.common import RetryPolicy
 
+from app.orchestrator.temporal.config import LLM_QUEUE
+
 # Temporal-safe imports
 with workflow.unsafe.imports_passed_through():
     from app.data import supabase_repo as repo
     from app.agents.enroll_agent import generate_followup_message
 
+_SIMULATED_REPLIES: tuple[str, ...] = (
+    "Thanks, I’ll review it soon.",
+    "Can you send more info about the program?",
+    "Not right now, maybe next month.",
+    "Yes, I’m interested — when is the deadline?",
+)
+
+# Batch workflow sizing: leads handled per run before continue-as-new,
+# and how many of them are in flight at once.
+BATCH_MAX = 100
+BATCH_CONCURRENCY = 8
+
+
+async def _simulate_followup(lead: dict) -> str:
+    """One simulated follow-up cycle; shared by the single and batch workflows."""
+    logger = workflow.logger
+    logger.info("🤖 Starting Simulated Follow-up Workflow for %s", lead.get("name"))
+
+    enrollment_id = lead["id"]
+    channel = lead.get("next_channel", "sms")
+    lead_name = lead.get("name", "Unknown")
+
+    # 1️⃣ Agent generates an outbound message
+    message = await workflow.execute_activity(
+        generate_followup_message,
+        args=[lead],
+        start_to_close_timeout=timedelta(seconds=20),
+        schedule_to_start_timeout=timedelta(seconds=60),
+        retry_policy=RetryPolicy(maximum_attempts=1),
+        task_queue=LLM_QUEUE,
+    )
+
+    # Single timestamp for the outbound row and enrollment patch (contact time = outbound send)
+    now_iso = workflow.now().isoformat()
+
+    # 2️⃣ Wait a simulated delay (represents waiting for student)
+    await workflow.sleep(5)
+
+    # 3️⃣ Simulated inbound reply (for testing)
+    simulated_reply = None
+    if workflow.random().random() < 0.6:
+        simulated_reply = workflow.random().choice(_SIMULATED_REPLIES)
+    else:
+        logger.info("🕓 No simulated reply for %s", lead_name)
+
+    # 4️⃣ Log outbound (+ inbound) interactions and mark follow-up timing in ONE
+    #    local activity (short Supabase writes: no task-queue round trip)
+    await workflow.execute_local_activity(
+        repo.finalize_followup,
+        repo.FollowupFinalizeInput(
+            enrollment_id=enrollment_id,
+            channel=channel,
+            outbound_message=message,
+            inbound_message=simulated_reply,
+            now_iso=now_iso,
+            workflow_id=workflow.info().workflow_id,
+        ),
+        # 5s per attempt (insert + PATCH); the overall cap leaves room for the retry
+        start_to_close_timeout=timedelta(seconds=5),
+        schedule_to_close_timeout=timedelta(seconds=15),
+        retry_policy=RetryPolicy(maximum_attempts=2),
+    )
+    logger.info(
+        "💬 Interactions logged for %s (inbound reply: %s)",
+        lead_name,
+        "yes" if simulated_reply else "no",
+    )
+
+    logger.info("✅ Workflow completed for %s", lead_name)
+    return "completed"
+
 
 @workflow.defn
 class SimulatedFollowupWorkflow:
@@ -38,75 +115,54 @@ class SimulatedFollowupWorkflow:
                     "next_channel": "sms" | "email" | "voice"
                 }
         """
-        logger = workflow.logger
-        logger.info(f"🤖 Starting Simulated Follow-up Workflow for {lead.get('name')}")
-
-        enrollment_id = lead["id"]
-        channel = lead.get("next_channel", "sms")
-        lead_name = lead.get("name", "Unknown")
-
-        # 1️⃣ Agent generates an outbound message
-        message = await workflow.execute_activity(
-            generate_followup_message,
-            args=[lead],
-            schedule_to_close_timeout=timedelta(seconds=20),
-            retry_policy=RetryPolicy(maximum_attempts=1),
-        )
-
-        # 2️⃣ Log outbound message
-        await workflow.execute_activity(
-            repo.insert_interaction,
-            args=[enrollment_id, channel, "outbound", "completed", message, "ai_generated"],
-            schedule_to_close_timeout=timedelta(seconds=10),
-            retry_policy=RetryPolicy(maximum_attempts=2),
-        )
-        logger.info(f"💬 Outbound message logged for {lead_name}")
-
-        # 3️⃣ Wait a simulated delay (represents waiting for student)
-        await workflow.sleep(5)
-
-        # 4️⃣ Simulated inbound reply (for testing)
-        import random
-        if workflow.random().random() < 0.6:
-            simulated_reply = workflow.random().choice([
-                "Thanks, I’ll review it soon.",
-                "Can you send more info about the program?",
-                "Not right now, maybe next month.",
-                "Yes, I’m interested — when is the deadline?",
-            ])
-            await workflow.execute_activity(
-                repo.insert_interaction,
-                args=[enrollment_id, channel, "inbound", "completed", simulated_reply, "user_reply"],
-                schedule_to_close_timeout=timedelta(seconds=10),
-                retry_policy=RetryPolicy(maximum_attempts=2),
-            )
-            logger.info(f"📩 Simulated inbound reply logged for {lead_name}")
-        else:
-            logger.info(f"🕓 No simulated reply for {lead_name}")
-
-        # 5️⃣ Mark next follow-up timing in Supabase
-        next_time = workflow.now().isoformat()
-        await workflow.execute_activity(
-        repo.patch_activity,
-        args=[
-            "campaign_enrollments",
-            f"id=eq.{enrollment_id}",
-            {
-                "last_contacted_at": next_time,
-                "updated_at": next_time,
-                "status": "active",
-            },
-            ],
-            schedule_to_close_timeout=timedelta(seconds=10),
-            retry_policy=RetryPolicy(maximum_attempts=1),
-        )
-
-        logger.info(f"✅ Workflow completed for {lead_name}")
-        return "completed"
+        return await _simulate_followup(lead)
 
     # 🧠 Optional: signal handler for external replies
     @workflow.signal
     async def inbound_reply(self, channel: str, message: str):
         """Handle a live inbound message signal from student."""
-        workflow.logger.info(f"⚡ Inbound signal on {channel}: {message}")
+        workflow.logger.info("⚡ Inbound signal on %s: %s", channel, message)
         self._last_inbound = {"channel": channel, "message": message}
+
+
+@workflow.defn
+class BatchSimulatedFollowupWorkflow:
+    """
+    Runs the simulated follow-up for many leads in one workflow, BATCH_MAX
+    leads per run, then continues-as-new with the rest so history stays bounded.
+    """
+
+    @workflow.run
+    async def run(self, leads: list, failed_lead_ids: list | None = None) -> dict:
+        """
+        Returns {"status", "failed_lead_ids"}; ids of leads whose follow-up
+        raised are carried across continue-as-new runs so none are lost.
+        """
+        failed_lead_ids = list(failed_lead_ids or [])
+        batch, rest = leads[:BATCH_MAX], leads[BATCH_MAX:]
+        sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def _one(lead: dict) -> str:
+            async with sem:
+                return await _simulate_followup(lead)
+
+        results = await asyncio.gather(*(_one(lead) for lead in batch), return_exceptions=True)
+        failed = 0
+        for lead, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                failed += 1
+                failed_lead_ids.append(lead.get("id"))
+                workflow.logger.warning("⚠️ Simulated follow-up failed for %s: %s", lead.get("id"), result)
+        workflow.logger.info(
+            "📦 Simulated follow-up batch done: %d leads, %d failed, %d remaining",
+            len(batch),
+            failed,
+            len(rest),
+        )
+
+        if rest:
+            workflow.continue_as_new(args=[rest, failed_lead_ids])
+        return {
+            "status": "completed_with_failures" if failed_lead_ids else "completed",
+            "failed_lead_ids": failed_lead_ids,
+        }
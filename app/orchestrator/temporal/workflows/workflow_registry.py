@@ -1,12 +1,44 @@
 # app/orchestrator/temporal/workflows/workflow_registry.py
+import asyncio
+import os
 from typing import Optional
-from temporalio.client import WorkflowHandle
+
+from temporalio.client import Client, WorkflowHandle
+from temporalio.service import KeepAliveConfig
+
+from app.orchestrator.temporal.common.converter import data_converter
 
 _latest_handle: Optional[WorkflowHandle] = None
 
+_client: Optional[Client] = None
+_client_lock = asyncio.Lock()
+
+
 def set_current_handle(handle: WorkflowHandle):
     global _latest_handle
     _latest_handle = handle
 
 def get_current_handle() -> Optional[WorkflowHandle]:
     return _latest_handle
+
+
+# --------------------------------------------------------------------------
+# Shared Temporal client (one gRPC channel, multiplexed over HTTP/2)
+# --------------------------------------------------------------------------
+
+async def get_client() -> Client:
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                _client = await Client.connect(
+                    os.getenv("TEMPORAL_TARGET", "localhost:7233"),
+                    namespace=os.getenv("TEMPORAL_NAMESPACE", "default"),
+                    data_converter=data_converter,
+                    keep_alive_config=KeepAliveConfig(
+                        interval_millis=int(os.getenv("TEMPORAL_KEEPALIVE_MS", "30000")),
+                        timeout_millis=15000,
+                    ),
+                )
+    return _client
+
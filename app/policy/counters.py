@@ -0,0 +1,95 @@
+# app/policy/counters.py
+"""
+Hot per-lead send counters for policy guards.
+
+Sends are counted in Redis hourly buckets (INCR + EXPIRE), so the
+"sent in the last 24h" check is one MGET over 24 keys instead of a
+COUNT(*) over `interactions` on every send. Postgres stays the durable
+audit log; these counters are only the fast path.
+
+A per-lead/channel "since" marker records when counting started. Until it
+is a full window old (or if it is gone because Redis was just enabled,
+flushed, restarted or evicted it), the buckets can't vouch for the whole
+24h and get_sent_24h returns None so the guard uses the DB count. Only
+sends that call incr_sent() are counted; any other send path must call it
+too or the cap undercounts.
+
+Disabled (every call returns None / no-ops) when REDIS_URL is unset or
+the redis package is missing, so callers fall back to the DB query.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Optional
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover
+    aioredis = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 3600
+WINDOW_BUCKETS = 24
+KEY_TTL_SECONDS = 90000  # 25h: a bucket outlives the window it can fall into
+
+_client = None
+
+
+def _get_redis():
+    global _client
+    if _client is None:
+        url = os.getenv("REDIS_URL")
+        if not url or aioredis is None:
+            return None
+        _client = aioredis.from_url(url, decode_responses=True)
+    return _client
+
+
+def _key(lead_id: str, channel: str, bucket: int) -> str:
+    return f"s:{lead_id}:{channel}:{bucket}"
+
+
+def _since_key(lead_id: str, channel: str) -> str:
+    return f"s:{lead_id}:{channel}:since"
+
+
+async def get_sent_24h(lead_id: Optional[str], channel: str, now: Optional[float] = None) -> Optional[int]:
+    """Sends to this lead/channel over the last 24 hourly buckets, or None if not known."""
+    r = _get_redis()
+    if r is None or not lead_id:
+        return None
+    ts = now if now is not None else time.time()
+    bucket = int(ts // BUCKET_SECONDS)
+    keys = [_key(lead_id, channel, b) for b in range(bucket - WINDOW_BUCKETS + 1, bucket + 1)]
+    try:
+        since, *values = await r.mget([_since_key(lead_id, channel), *keys])
+    except Exception as e:
+        logger.debug("SendCounterReadFailed", extra={"error": str(e)})
+        return None
+    # Cold window: counting hasn't covered the last 24h yet (or Redis lost it)
+    if since is None or ts - float(since) < WINDOW_BUCKETS * BUCKET_SECONDS:
+        return None
+    return sum(int(v) for v in values if v)
+
+
+async def incr_sent(lead_id: Optional[str], channel: str, now: Optional[float] = None) -> None:
+    """Count one successful send (best effort; never raises)."""
+    r = _get_redis()
+    if r is None or not lead_id:
+        return
+    ts = now if now is not None else time.time()
+    key = _key(lead_id, channel, int(ts // BUCKET_SECONDS))
+    since_key = _since_key(lead_id, channel)
+    try:
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, KEY_TTL_SECONDS)
+            # First counted send starts the window; later sends only keep it alive
+            pipe.set(since_key, ts, nx=True)
+            pipe.expire(since_key, KEY_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.debug("SendCounterIncrFailed", extra={"error": str(e)})
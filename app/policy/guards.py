@@ -1,15 +1,19 @@
-# app/policy/guards_budget.py
+# app/policy/guards.py
 from __future__ import annotations
 
 import logging
+import os
 from datetime import datetime, time, timedelta, timezone
-from typing import Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AbstractSet, Dict, Any, FrozenSet, Iterable, Optional, Tuple
+
+from app.policy import counters
 
 logger = logging.getLogger(__name__)
 
 CONFIDENCE_THRESHOLD = 0.6
 
-import os
 # ---- LLM spend caps (defaults; override via env) ----
 # (keep/define any other channel budgets you use here, e.g.)
 LLM_DAILY_BUDGET_CENTS = int(os.getenv("LLM_DAILY_BUDGET_CENTS", "500"))
@@ -30,12 +34,12 @@ class PolicyDenied(Exception):
 
 def check_quiet_hours(now: datetime, start: time = time(21, 0), end: time = time(8, 0)) -> None:
     """Deny if current local time is within quiet hours window."""
-    n = now.timetz()
-    if start <= end:
-        blocked = start <= n <= end
-    else:
-        blocked = (n >= start) or (n <= end)
-    if blocked:
+    start_min, span_min = _quiet_window(start, end)
+    _check_quiet_minutes(now, start_min, span_min)
+
+
+def _check_quiet_minutes(now: datetime, start_min: int, span_min: int) -> None:
+    if _in_quiet_window(now, start_min, span_min):
         raise PolicyDenied("quiet_hours", "Sending blocked during quiet hours")
 
 
@@ -49,11 +53,76 @@ def check_frequency(sent_last_24h: int, cap: int = 3) -> None:
         raise PolicyDenied("freq_cap", "Frequency cap reached")
 
 
-def check_dnc(dnc_labels: set[str], enrollment_labels: set[str]) -> None:
-    if dnc_labels and (dnc_labels & enrollment_labels):
+def check_dnc(dnc_labels: AbstractSet[str], enrollment_labels: Iterable[str]) -> None:
+    if not enrollment_labels or not dnc_labels:
+        return
+    if not dnc_labels.isdisjoint(enrollment_labels):
         raise PolicyDenied("dnc", "Recipient is on do-not-contact list")
 
 
+# ----------------------------
+# Compiled policy
+# ----------------------------
+
+_DEFAULT_DNC_LABELS = ("dnc", "do_not_contact", "do_not_call")
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """Policy knobs parsed once: frozen DNC labels, quiet window in minutes, typed caps."""
+    quiet_hours_enabled: bool
+    quiet_start_min: int
+    quiet_span_min: int
+    frequency_cap: Optional[int]
+    respect_dnc: bool
+    dnc_labels: FrozenSet[str]
+    default_consent: bool
+
+
+@lru_cache(maxsize=256)
+def _compile_policy(
+    quiet_hours: Any,
+    quiet_start: str,
+    quiet_end: str,
+    frequency_cap: Optional[int],
+    respect_dnc: Any,
+    dnc_labels: Tuple[Any, ...],
+    default_consent: Any,
+) -> CompiledPolicy:
+    start_min, span_min = _compile_quiet_hours(quiet_start, quiet_end)
+    return CompiledPolicy(
+        quiet_hours_enabled=bool(quiet_hours),
+        quiet_start_min=start_min,
+        quiet_span_min=span_min,
+        frequency_cap=frequency_cap,
+        respect_dnc=bool(respect_dnc),
+        dnc_labels=frozenset(map(str, dnc_labels)),
+        default_consent=bool(default_consent),
+    )
+
+
+def compile_policy(policy: Dict[str, Any]) -> CompiledPolicy:
+    """
+    Return the CompiledPolicy for a policy dict.
+
+    Cached on the policy *values* rather than id(policy): org policies are
+    re-fetched as fresh dicts per activity, and ids are reused after GC.
+    """
+    args = (
+        policy.get("quiet_hours", True),
+        policy.get("quiet_start", "21:00"),
+        policy.get("quiet_end", "08:00"),
+        policy.get("frequency_cap_per_24h", 3),
+        policy.get("respect_dnc", True),
+        tuple(policy.get("dnc_labels", _DEFAULT_DNC_LABELS)),
+        policy.get("default_consent", True),
+    )
+    try:
+        return _compile_policy(*args)
+    except TypeError:  # unhashable knob value; compile without caching
+        return _compile_policy.__wrapped__(*args)
+
+
 # ----------------------------
 # Orchestrator-facing API
 # ----------------------------
@@ -70,36 +139,36 @@ def pre_send_decision(
     Returns a verdict dict instead of raising so the workflow can branch.
     """
     raw_now: Optional[datetime] = context.get("now")
-    if isinstance(raw_now, str):
-        now = datetime.fromisoformat(raw_now.replace("Z", "+00:00"))
-    elif isinstance(raw_now, datetime):
+    if isinstance(raw_now, datetime):
         now = raw_now
+    elif isinstance(raw_now, str):
+        if raw_now.endswith("Z"):
+            now = datetime.fromisoformat(raw_now[:-1]).replace(tzinfo=timezone.utc)
+        else:
+            now = datetime.fromisoformat(raw_now)
     else:
         now = datetime.now(timezone.utc)
 
-    quiet_hours_enabled = bool(policy.get("quiet_hours", True))
-    quiet_start = _parse_hhmm(policy.get("quiet_start", "21:00"))
-    quiet_end = _parse_hhmm(policy.get("quiet_end", "08:00"))
-    freq_cap = policy.get("frequency_cap_per_24h", 3)
-    respect_dnc = bool(policy.get("respect_dnc", True))
-    dnc_labels = set(map(str, policy.get("dnc_labels", ["dnc", "do_not_contact", "do_not_call"])))
+    cp = compile_policy(policy)
 
-    has_consent = bool(enrollment.get("consent", policy.get("default_consent", True)))
-    enrollment_labels = set(map(str, enrollment.get("labels", [])))
+    has_consent = bool(enrollment.get("consent", cp.default_consent))
+    enrollment_labels = enrollment.get("labels") or ()
+    if enrollment_labels and not all(type(label) is str for label in enrollment_labels):
+        enrollment_labels = map(str, enrollment_labels)
     sent_last_24h = int(context.get("sent_count_last_24h", 0))
 
     try:
-        if respect_dnc:
-            check_dnc(dnc_labels, enrollment_labels)
+        if cp.respect_dnc and enrollment_labels:  # most leads carry no labels
+            check_dnc(cp.dnc_labels, enrollment_labels)
         check_consent(has_consent)
-        if quiet_hours_enabled:
-            check_quiet_hours(_to_naive_time(now), start=quiet_start, end=quiet_end)
-        check_frequency(sent_last_24h, cap=freq_cap)
+        if cp.quiet_hours_enabled:
+            _check_quiet_minutes(_to_naive_time(now), cp.quiet_start_min, cp.quiet_span_min)
+        check_frequency(sent_last_24h, cap=cp.frequency_cap)
         return {"allow": True}
     except PolicyDenied as e:
         hint: Dict[str, Any] = {}
         if e.code == "quiet_hours":
-            next_time = _next_allowed_time(_to_naive_time(now), quiet_start, quiet_end)
+            next_time = _next_allowed_time(_to_naive_time(now), cp.quiet_start_min, cp.quiet_span_min)
             hint = {"schedule_after": next_time.isoformat()}
         elif e.code == "freq_cap":
             hint = {"retry_in_hours": 24}
@@ -115,26 +184,20 @@ def pre_send_decision(
 # Async convenience for activities
 # ----------------------------
 
-async def evaluate_policy_guards(
-    db, lead: Dict[str, Any], org: Dict[str, Any], channel: str
-) -> Tuple[bool, str]:
-    """
-    Async helper called by Temporal activities (SMS/Email/Voice).
+_SENT_LAST_24H_SQL = """
+    SELECT COUNT(*) AS cnt
+    FROM interactions
+    WHERE lead_id = $1 AND channel = $2
+      AND created_at > (NOW() - INTERVAL '24 hours')
+"""
 
-    Fetches count of recent sends and applies pre_send_decision logic.
-    Returns (allowed, reason).
-    """
-    # --- Fetch recent send count from interactions table --------------------
-    q = """
-        SELECT COUNT(*) AS cnt
-        FROM interactions
-        WHERE lead_id = $1 AND channel = $2
-          AND created_at > (NOW() - INTERVAL '24 hours')
-    """
+
+async def _db_sent_last_24h(db, lead_id: Optional[str], channel: str) -> Tuple[int, Any]:
+    """Fallback send count from the interactions table: (count, raw_result)."""
     sent_last_24h = 0
     result = None
     try:
-        maybe_result = await db.execute_query(q, lead.get("id"), channel)
+        maybe_result = await db.execute_query(_SENT_LAST_24H_SQL, lead_id, channel)
         # If fake_query was defined as async def returning a list, this is fine.
         # If it returns a coroutine (common pytest mock pitfall), await it.
         if callable(maybe_result):
@@ -152,12 +215,30 @@ async def evaluate_policy_guards(
     except Exception as e:
         logger.debug("PolicyGuardDBFallback", extra={"error": str(e)})
         sent_last_24h = 0
+    return sent_last_24h, result
 
-    # 🔍 Debug diagnostic
-    logger.debug(
-        "TEST_DEBUG_SENT_LAST_24H",
-        extra={"lead_id": lead.get("id"), "sent_last_24h": sent_last_24h, "raw_result": str(result)}
-    )
+
+async def evaluate_policy_guards(
+    db, lead: Dict[str, Any], org: Dict[str, Any], channel: str
+) -> Tuple[bool, str]:
+    """
+    Async helper called by Temporal activities (SMS/Email/Voice).
+
+    Fetches count of recent sends and applies pre_send_decision logic.
+    Returns (allowed, reason).
+    """
+    # --- Recent send count: Redis hot counter, DB COUNT(*) as fallback -----
+    result = None
+    sent_last_24h = await counters.get_sent_24h(lead.get("id"), channel)
+    if sent_last_24h is None:
+        sent_last_24h, result = await _db_sent_last_24h(db, lead.get("id"), channel)
+
+    # 🔍 Debug diagnostic (str(result) only when debug logging is on)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "TEST_DEBUG_SENT_LAST_24H",
+            extra={"lead_id": lead.get("id"), "sent_last_24h": sent_last_24h, "raw_result": str(result)}
+        )
 
     # --- Resolve policy and enrollment context ------------------------------
     policy = org.get("policy") or org  # support nested or flat org dicts
@@ -169,7 +250,7 @@ async def evaluate_policy_guards(
         "timezone": lead.get("timezone", org.get("timezone", "America/New_York")),
     }
     step = {"channel": channel}
-    context = {"sent_count_last_24h": sent_last_24h, "now": datetime.utcnow().isoformat()}
+    context = {"sent_count_last_24h": sent_last_24h, "now": datetime.now(timezone.utc)}
 
     # --- Evaluate via core deterministic logic ------------------------------
     verdict = pre_send_decision(enrollment=enrollment, step=step, policy=policy, context=context)
@@ -207,27 +288,63 @@ def _parse_hhmm(s: str) -> time:
         return time(21, 0) if "21" in s else time(8, 0)
 
 
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+@lru_cache(maxsize=256)
+def _quiet_window(start: time, end: time) -> Tuple[int, int]:
+    """(start_min, span_min): quiet when now is within span_min minutes after start (inclusive)."""
+    start_min = _minutes(start)
+    return start_min, (_minutes(end) - start_min) % 1440
+
+
+@lru_cache(maxsize=256)
+def _compile_quiet_hours(start_str: str, end_str: str) -> Tuple[int, int]:
+    """Parse policy HH:MM strings once per distinct window."""
+    return _quiet_window(_parse_hhmm(start_str), _parse_hhmm(end_str))
+
+
 def _to_naive_time(dt: datetime) -> datetime:
     if dt.tzinfo:
         return dt.astimezone(timezone.utc).replace(tzinfo=None)
     return dt
 
 
-def _next_allowed_time(now: datetime, start: time, end: time) -> datetime:
-    today = now.date()
-    cur_t = now.time()
-    if start <= end:
-        if start <= cur_t <= end:
-            return datetime.combine(today, end) + timedelta(minutes=1)
-        return now
-    else:
-        in_block = (cur_t >= start) or (cur_t <= end)
-        if in_block:
-            target_day = today if cur_t <= end else (today + timedelta(days=1))
-            return datetime.combine(target_day, end) + timedelta(minutes=1)
+_MIN_US = 60 * 1_000_000
+_DAY_US = 1440 * _MIN_US
+
+
+def _time_of_day_us(now: datetime) -> int:
+    return ((now.hour * 60 + now.minute) * 60 + now.second) * 1_000_000 + now.microsecond
+
+
+def _in_quiet_window(now: datetime, start_min: int, span_min: int) -> bool:
+    # One modular compare covers both same-day and midnight-crossing windows.
+    # Microsecond resolution keeps the inclusive time() bounds: with end=17:00,
+    # 17:00:00 is quiet but 17:00:30 is not; start == end blocks only that instant.
+    return (_time_of_day_us(now) - start_min * _MIN_US) % _DAY_US <= span_min * _MIN_US
+
+
+def _next_allowed_time(now: datetime, start_min: int, span_min: int) -> datetime:
+    if not _in_quiet_window(now, start_min, span_min):
         return now
+    end_min = (start_min + span_min) % 1440
+    # end + 1 minute: today if we're still before/at end, else tomorrow (wrapping window)
+    days = 0 if _time_of_day_us(now) <= end_min * _MIN_US else 1
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + timedelta(days=days, minutes=end_min + 1)
 
 __all__ = [
+    "PolicyDenied",
+    "CompiledPolicy",
+    "check_quiet_hours",
+    "check_consent",
+    "check_frequency",
+    "check_dnc",
+    "compile_policy",
+    "pre_send_decision",
+    "evaluate_policy_guards",
     "LLM_DAILY_BUDGET_CENTS",
     "EMAIL_DAILY_BUDGET_CENTS",
     "SMS_DAILY_BUDGET_CENTS",
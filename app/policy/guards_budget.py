@@ -4,13 +4,19 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Tuple
 
+# Single source for the shared exception and budget constants
+from app.policy.guards import (  # noqa: F401
+    PolicyDenied,
+    LLM_DAILY_BUDGET_CENTS,
+    EMAIL_DAILY_BUDGET_CENTS,
+    SMS_DAILY_BUDGET_CENTS,
+    VOICE_DAILY_BUDGET_CENTS,
+)
+
 logger = logging.getLogger(__name__)
 
-class BudgetDenied(Exception):
-    def __init__(self, code: str, reason: str):
-        super().__init__(reason)
-        self.code = code
-        self.reason = reason
+class BudgetDenied(PolicyDenied):
+    """Budget / rate cap denial; caught by `except PolicyDenied` too."""
 
 
 # -----------------------------------------------------------
@@ -33,6 +39,17 @@ def check_rate(count_last_hour: int, hourly_limit: int | None) -> None:
 # Async orchestrator helper
 # -----------------------------------------------------------
 
+# Served by idx_interactions_campaign_channel_created (sql/migrations/0033_*)
+_BUDGET_AND_RATE_SQL = """
+    SELECT
+      COALESCE(SUM(cost_usd), 0) AS spent,
+      COUNT(*) FILTER (
+        WHERE channel = $2 AND created_at > (NOW() - INTERVAL '1 hour')
+      ) AS cnt
+    FROM interactions
+    WHERE campaign_id = $1
+"""
+
 async def evaluate_budget_caps(
     db, campaign_id: str, channel: str, policy: Dict[str, Any]
 ) -> Tuple[bool, str, Dict[str, Any] | None]:
@@ -42,23 +59,12 @@ async def evaluate_budget_caps(
     Returns (allowed, reason, hint)
     """
     try:
-        # --- Query aggregated campaign spend / send counts ------------------
-        q_budget = """
-            SELECT COALESCE(SUM(cost_usd),0) AS spent
-            FROM interactions
-            WHERE campaign_id = $1
-        """
-        q_rate = """
-            SELECT COUNT(*) AS cnt
-            FROM interactions
-            WHERE campaign_id = $1 AND channel = $2
-              AND created_at > (NOW() - INTERVAL '1 hour')
-        """
-        res_budget = await db.execute_query(q_budget, campaign_id)
-        res_rate = await db.execute_query(q_rate, campaign_id, channel)
-
-        spent = float(res_budget[0].get("spent", 0) if res_budget else 0)
-        count_last_hour = int(res_rate[0].get("cnt", 0) if res_rate else 0)
+        # --- Campaign spend + hourly send count in one round trip -----------
+        res = await db.execute_query(_BUDGET_AND_RATE_SQL, campaign_id, channel)
+        row = res[0] if res else {}
+
+        spent = float(row.get("spent") or 0)
+        count_last_hour = int(row.get("cnt") or 0)
 
     except Exception as e:
         logger.warning("BudgetCapQueryError", extra={"error": str(e)})
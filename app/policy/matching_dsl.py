@@ -1,36 +1,141 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 # Rule row shape: {"dsl": {"if": {...}, "then": {"program_code": "X", "score": 0.9}}}
 
-def evaluate_ruleset(lead: Dict[str, Any], rules: List[Dict[str, Any]]):
-    scores, gaps, seen = [], [], set()
-    interest = (lead.get("interest") or "").lower()
-    zipc = (lead.get("zip") or "")
-    gpa = float(lead.get("gpa") or 0)
 
+# -----------------------------------------------------------------------------
+# Compiled ruleset (structure-of-arrays, one slot per rule)
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class CompiledRules:
+    codes: Tuple[Optional[str], ...]                      # then.program_code
+    scores: np.ndarray                                    # then.score (float64)
+    min_gpa: np.ndarray                                   # -inf when unconstrained
+    interest_substr: Tuple[Optional[str], ...]            # lowercased, None = any
+    zip_prefixes: Tuple[Optional[Tuple[str, ...]], ...]   # "*" stripped, None = any
+    # Rules carrying a program_code, grouped by code for reduceat collation
+    code_names: Tuple[str, ...]                           # sorted distinct codes
+    code_order: np.ndarray                                # rule indices, grouped by code
+    code_starts: np.ndarray                               # group offsets into code_order
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def compile_ruleset(rules: List[Dict[str, Any]]) -> CompiledRules:
+    """Parse rule DSL once so leads can be scored without per-rule dict walks."""
+    codes, scores, min_gpa, substr, prefixes = [], [], [], [], []
     for r in rules:
         dsl = r.get("dsl", {})
         cond = dsl.get("if", {})
-        ok = True
-        if "interest_contains" in cond:
-            ok &= cond["interest_contains"].lower() in interest
-        if "zip_in" in cond:
-            ok &= any(zipc.startswith(p.rstrip("*")) for p in cond["zip_in"])
-        if "min_gpa" in cond:
-            ok &= gpa >= float(cond["min_gpa"])
-
-        code = dsl.get("then", {}).get("program_code")
-        base = float(dsl.get("then", {}).get("score", 0.8))
-        if ok and code and code not in seen:
-            scores.append({"program_code": code, "score": base, "source": "rules"})
-            seen.add(code)
-        elif code:
-            gaps.append(code)
-
-    # Collapse duplicates by max score
-    merged = {}
-    for s in scores:
-        merged[s["program_code"]] = max(merged.get(s["program_code"], 0.0), float(s["score"]))
-    result = [{"program_code": k, "score": v, "source": "rules"} for k, v in merged.items()]
-    return result, sorted(set(gaps))
+        then = dsl.get("then", {})
+        codes.append(then.get("program_code"))
+        scores.append(float(then.get("score", 0.8)))
+        min_gpa.append(float(cond["min_gpa"]) if "min_gpa" in cond else -np.inf)
+        substr.append(cond["interest_contains"].lower() if "interest_contains" in cond else None)
+        prefixes.append(
+            tuple(p.rstrip("*") for p in cond["zip_in"]) if "zip_in" in cond else None
+        )
+    code_names = tuple(sorted({c for c in codes if c}))
+    slot = {c: i for i, c in enumerate(code_names)}
+    coded = [i for i, c in enumerate(codes) if c]
+    code_order = np.asarray(sorted(coded, key=lambda i: slot[codes[i]]), dtype=np.intp)
+    sizes = np.bincount([slot[codes[i]] for i in coded], minlength=len(code_names))
+    return CompiledRules(
+        codes=tuple(codes),
+        scores=np.asarray(scores, dtype=np.float64),
+        min_gpa=np.asarray(min_gpa, dtype=np.float64),
+        interest_substr=tuple(substr),
+        zip_prefixes=tuple(prefixes),
+        code_names=code_names,
+        code_order=code_order,
+        code_starts=np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp),
+    )
+
+
+# Compiled rulesets keyed by caller (e.g. rules_version); reused only while
+# the raw rules compare equal, so a re-fetched but unchanged ruleset is
+# compiled once.
+_COMPILED: Dict[Any, Tuple[List[Dict[str, Any]], CompiledRules]] = {}
+_COMPILED_MAX = 64
+
+
+def compile_ruleset_cached(key: Any, rules: List[Dict[str, Any]]) -> CompiledRules:
+    hit = _COMPILED.get(key)
+    if hit is not None and hit[0] == rules:
+        return hit[1]
+    if len(_COMPILED) >= _COMPILED_MAX:
+        _COMPILED.clear()
+    cr = compile_ruleset(rules)
+    _COMPILED[key] = (rules, cr)
+    return cr
+
+
+def _column_mask(values: List[str], conds: Tuple[Any, ...], test) -> np.ndarray:
+    """(leads x rules) mask; each distinct condition is tested once per lead."""
+    mask = np.ones((len(values), len(conds)), dtype=bool)
+    cache: Dict[Any, np.ndarray] = {}
+    for j, c in enumerate(conds):
+        if c is None:
+            continue
+        col = cache.get(c)
+        if col is None:
+            col = cache[c] = np.fromiter((test(v, c) for v in values), dtype=bool, count=len(values))
+        mask[:, j] = col
+    return mask
+
+
+def match_mask(leads: List[Dict[str, Any]], cr: CompiledRules) -> np.ndarray:
+    """Boolean (leads x rules) matrix: rule j's conditions hold for lead i."""
+    interests = [(lead.get("interest") or "").lower() for lead in leads]
+    zips = [(lead.get("zip") or "") for lead in leads]
+    gpa = np.fromiter((float(lead.get("gpa") or 0) for lead in leads), dtype=np.float64, count=len(leads))
+
+    mask = gpa[:, None] >= cr.min_gpa[None, :]
+    mask &= _column_mask(interests, cr.interest_substr, str.__contains__)
+    mask &= _column_mask(zips, cr.zip_prefixes, str.startswith)  # multi-prefix tuple
+    return mask
+
+
+def evaluate_batch(leads: List[Dict[str, Any]], cr: CompiledRules):
+    """
+    Score many leads against one compiled ruleset; one (scores, gaps) per lead.
+    Per code, the first matching rule wins; codes with any unmatched or
+    shadowed rule are reported as gaps.
+    """
+    if not len(cr.code_names):
+        return [([], []) for _ in leads]
+
+    order, starts = cr.code_order, cr.code_starts
+    ok = match_mask(leads, cr)[:, order]                  # leads x coded rules, grouped
+
+    # Running match count restarted at each code group -> first hit per group
+    run = np.cumsum(ok, axis=1)
+    before = np.where(starts > 0, run[:, starts - 1], 0)
+    run -= np.repeat(before, np.diff(np.append(starts, len(order))), axis=1)
+    first = ok & (run == 1)
+
+    matched = np.logical_or.reduceat(ok, starts, axis=1)
+    gap = np.logical_or.reduceat(~first, starts, axis=1)
+    score = np.maximum.reduceat(np.where(first, cr.scores[order], -np.inf), starts, axis=1)
+    first_pos = np.minimum.reduceat(np.where(first, order, len(cr)), starts, axis=1)
+
+    names = cr.code_names
+    out = []
+    for i in range(len(leads)):
+        hit = np.flatnonzero(matched[i])
+        hit = hit[np.argsort(first_pos[i, hit], kind="stable")]
+        out.append((
+            [{"program_code": names[g], "score": float(score[i, g]), "source": "rules"} for g in hit],
+            [names[g] for g in np.flatnonzero(gap[i])],
+        ))
+    return out
+
+
+def evaluate_ruleset(lead: Dict[str, Any], rules: List[Dict[str, Any]] | CompiledRules):
+    cr = rules if isinstance(rules, CompiledRules) else compile_ruleset(rules)
+    return evaluate_batch([lead], cr)[0]
@@ -1,6 +1,6 @@
 from typing import Optional, Dict, Any
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime
 import asyncpg
 
 class HandoffRepo:
@@ -15,6 +15,77 @@ class HandoffRepo:
         "review_outcome": 240,    # 4 hours
     }
 
+    # Explicit projections instead of *: FULL_COLUMNS is what the API returns
+    # (HandoffResponse); SUMMARY_COLUMNS skips the jsonb/text payload columns
+    # for callers that only need lifecycle state.
+    FULL_COLUMNS = (
+        "id, organization_id, lead_id, interaction_id, task_type, source, source_key, "
+        "title, description, priority, status, assigned_to, sla_due_at, "
+        "first_response_at, resolved_at, outcome_snapshot, metadata"
+    )
+    SUMMARY_COLUMNS = (
+        "id, organization_id, status, sla_due_at, first_response_at, resolved_at, re_resolve_count"
+    )
+
+    # Statement text is fixed per operation so asyncpg's per-connection
+    # statement cache (keyed on the SQL string) reuses the prepared plan
+    # instead of parsing/planning on every call.
+
+    # Idempotent create: one index probe on uq_open_handoff_identity (partial
+    # unique index, sql/migrations/0031_handoff.sql). On conflict nothing is
+    # written (the open row's updated_at is left alone) and no row comes back;
+    # create() then reads the existing open/in_progress row with FIND_OPEN_SQL.
+    CREATE_SQL = """
+    INSERT INTO handoffs (
+      organization_id, lead_id, interaction_id, task_type, source, source_key,
+      title, description, priority, status, assigned_to, sla_due_at, metadata
+    )
+    VALUES ($1,$3,$6,$2,$4,$5,$7,$8,$9,'open',$10,
+            COALESCE($11::timestamptz, NOW() + make_interval(mins => $13)), $12)
+    ON CONFLICT (
+      organization_id,
+      task_type,
+      COALESCE(lead_id, '00000000-0000-0000-0000-000000000000'::uuid),
+      source,
+      COALESCE(source_key, '')
+    ) WHERE status IN ('open','in_progress')
+    DO NOTHING
+    RETURNING """ + FULL_COLUMNS + ";"
+
+    FIND_OPEN_SQL = """
+    SELECT """ + FULL_COLUMNS + """ FROM handoffs
+    WHERE organization_id=$1 AND task_type=$2
+      AND COALESCE(lead_id,'00000000-0000-0000-0000-000000000000'::uuid)
+          = COALESCE($3::uuid,'00000000-0000-0000-0000-000000000000'::uuid)
+      AND source=$4 AND COALESCE(source_key,'') = COALESCE($5::text,'')
+      AND status IN ('open','in_progress')
+    ORDER BY created_at ASC
+    LIMIT 1;
+    """
+
+    MARK_FIRST_RESPONSE_SQL = """
+    UPDATE handoffs
+    SET first_response_at = COALESCE(first_response_at, NOW()),
+        status = CASE WHEN status='open' THEN 'in_progress' ELSE status END
+    WHERE id=$1
+    RETURNING """ + SUMMARY_COLUMNS + ";"
+
+    RESOLVE_SQL = """
+    UPDATE handoffs
+    SET
+      status = 'resolved',
+      resolved_at = COALESCE(resolved_at, NOW()),
+      resolved_by = COALESCE(resolved_by, $2),
+      resolution_note = COALESCE(resolution_note, $3),
+      outcome_snapshot = COALESCE(outcome_snapshot, '{}'::jsonb) || $4::jsonb,
+      re_resolve_count = CASE WHEN resolved_at IS NULL THEN re_resolve_count
+                              ELSE re_resolve_count + 1 END
+    WHERE id=$1
+    RETURNING """ + FULL_COLUMNS + ";"
+
+    GET_SQL = "SELECT " + FULL_COLUMNS + " FROM handoffs WHERE id=$1;"
+    GET_SUMMARY_SQL = "SELECT " + SUMMARY_COLUMNS + " FROM handoffs WHERE id=$1;"
+
     async def create(
         self,
         *,
@@ -33,48 +104,25 @@ class HandoffRepo:
     ) -> dict:
         """Create a handoff. If an equivalent OPEN task exists, return it (idempotent create)."""
         metadata = metadata or {}
+        # SLA due time is computed by Postgres (NOW() + minutes) unless given explicitly
         minutes = self.SLA_DEFAULTS_MIN.get(task_type, 1440)
-        sla_due_at = explicit_sla_due_at or datetime.utcnow() + timedelta(minutes=minutes)
 
-        sql = """
-        WITH existing AS (
-          SELECT * FROM handoffs
-          WHERE organization_id=$1 AND task_type=$2 AND COALESCE(lead_id,'00000000-0000-0000-0000-000000000000') = COALESCE($3,'00000000-0000-0000-0000-000000000000')
-            AND source=$4 AND COALESCE(source_key,'') = COALESCE($5,'')
-            AND status IN ('open','in_progress')
-          ORDER BY created_at ASC
-          LIMIT 1
-        ), ins AS (
-          INSERT INTO handoffs (
-            organization_id, lead_id, interaction_id, task_type, source, source_key,
-            title, description, priority, status, assigned_to, sla_due_at, metadata
-          )
-          SELECT $1,$3,$6,$2,$4,$5,$7,$8,$9,'open',$10,$11,$12
-          WHERE NOT EXISTS (SELECT 1 FROM existing)
-          RETURNING *
-        )
-        SELECT * FROM ins
-        UNION ALL
-        SELECT * FROM existing;
-        """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(sql, organization_id, task_type, lead_id, source, source_key,
-                                      interaction_id, title, description, priority, assigned_to, sla_due_at, metadata)
-            return dict(row)
+        row = await self.pool.fetchrow(self.CREATE_SQL, organization_id, task_type, lead_id, source, source_key,
+                                       interaction_id, title, description, priority, assigned_to,
+                                       explicit_sla_due_at, metadata, minutes)
+        if row is None:
+            # Conflict: an equivalent open task exists (own statement, so a row
+            # committed by a concurrent create is visible here)
+            row = await self.pool.fetchrow(self.FIND_OPEN_SQL, organization_id, task_type, lead_id,
+                                           source, source_key)
+        return dict(row)
 
     async def mark_first_response(self, *, handoff_id: UUID) -> dict:
-        sql = """
-        UPDATE handoffs
-        SET first_response_at = COALESCE(first_response_at, NOW()),
-            status = CASE WHEN status='open' THEN 'in_progress' ELSE status END
-        WHERE id=$1
-        RETURNING *;
-        """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(sql, handoff_id)
-            if not row:
-                raise ValueError("Handoff not found")
-            return dict(row)
+        """Stamp first_response_at / move open -> in_progress. Returns the summary columns."""
+        row = await self.pool.fetchrow(self.MARK_FIRST_RESPONSE_SQL, handoff_id)
+        if not row:
+            raise ValueError("Handoff not found")
+        return dict(row)
 
     async def resolve(
         self,
@@ -88,26 +136,16 @@ class HandoffRepo:
         Resolve a handoff. Idempotent: if already resolved, do not change timestamps; do merge snapshot+note.
         """
         # Merge outcome snapshots: latest keys overwrite, track re_resolve_count
-        sql = """
-        UPDATE handoffs
-        SET
-          status = 'resolved',
-          resolved_at = COALESCE(resolved_at, NOW()),
-          resolved_by = COALESCE(resolved_by, $2),
-          resolution_note = COALESCE(resolution_note, $3),
-          outcome_snapshot = COALESCE(outcome_snapshot, '{}'::jsonb) || $4::jsonb,
-          re_resolve_count = CASE WHEN resolved_at IS NULL THEN re_resolve_count
-                                  ELSE re_resolve_count + 1 END
-        WHERE id=$1
-        RETURNING *;
-        """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(sql, handoff_id, resolved_by, resolution_note, outcome_snapshot)
-            if not row:
-                raise ValueError("Handoff not found")
-            return dict(row)
+        row = await self.pool.fetchrow(self.RESOLVE_SQL, handoff_id, resolved_by, resolution_note, outcome_snapshot)
+        if not row:
+            raise ValueError("Handoff not found")
+        return dict(row)
 
     async def get(self, handoff_id: UUID) -> Optional[dict]:
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM handoffs WHERE id=$1;", handoff_id)
-            return dict(row) if row else None
+        row = await self.pool.fetchrow(self.GET_SQL, handoff_id)
+        return dict(row) if row else None
+
+    async def get_summary(self, handoff_id: UUID) -> Optional[dict]:
+        """Lifecycle fields only (no outcome_snapshot / metadata payloads)."""
+        row = await self.pool.fetchrow(self.GET_SUMMARY_SQL, handoff_id)
+        return dict(row) if row else None
@@ -1,7 +1,8 @@
 from __future__ import annotations
-import os, asyncio, time, json
+import os, asyncio, contextlib, json, random
 from typing import Any, Dict, Optional, Sequence, Tuple
-import requests
+import httpx
+import orjson
 from pydantic import BaseModel, ValidationError
 
 from .dtos import MessageDTO, EventDTO, LinkRefDTO, EnrollmentStatusDTO
@@ -9,6 +10,7 @@ from supabase import create_client
 
 DEFAULT_TIMEOUT = 20
 RETRYABLE = (408, 429, 500, 502, 503, 504)
+MAX_RETRY_AFTER_SECONDS = 30.0  # never park a request longer than this on Retry-After
 
 class SupabaseRepo:
     def __init__(self):
@@ -25,24 +27,162 @@ class SupabaseRepoConfig(BaseModel):
     timeout_seconds: int = DEFAULT_TIMEOUT
     max_attempts: int = 4
     base_backoff_seconds: float = 0.25  # 250ms → ~2s
+    max_backoff_seconds: float = 5.0
+    # HTTP/2 multiplexes concurrent requests as streams, so a few TLS
+    # connections carry the whole fan-out (no socket per in-flight request)
+    max_connections: int = 4
+    # Upsert coalescing for log_outbound / log_inbound (False = one POST per call);
+    # the linger only applies once other rows are already queued
+    upsert_batching: bool = True
+    upsert_batch_max_rows: int = 500
+    upsert_linger_seconds: float = 0.05
 
     @classmethod
     def from_env(cls) -> "SupabaseRepoConfig":
         url = os.environ["SUPABASE_URL"].rstrip("/")
         key = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ["SUPABASE_SERVICE_ROLE_KEY"]
         schema = os.environ.get("DB_SCHEMA", "dev_nexus")
-        return cls(base_url=url, service_key=key, schema=schema)
+        max_conns = int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "4"))
+        return cls(base_url=url, service_key=key, schema=schema, max_connections=max_conns)
+
+# PostgREST upsert: POST + Prefer: resolution=merge-duplicates + on_conflict.
+# on_conflict is baked into the path (pre-encoded) so hot writes skip params encoding.
+_UPSERT_QUERY = "?on_conflict=provider_ref%2Cdirection"
+_UPSERT_HEADERS = {"Prefer": "return=representation,resolution=merge-duplicates"}
+# Request bodies are encoded with orjson (C) rather than httpx's stdlib json;
+# Content-Type: application/json is already a client default header.
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+
+def _upsert_key(row: Dict[str, Any]) -> Tuple[Any, Any]:
+    return row.get("provider_ref"), row.get("direction")
+
+
+class _UpsertBatcher:
+    """
+    Coalesces concurrent upserts to one PostgREST table into array POSTs.
+    A lone row is sent at once; when other rows are already queued behind
+    it, the batch stays open for `linger` seconds (or `max_rows` rows).
+    Every caller awaits its own row from the combined response.
+    """
+
+    def __init__(self, repo: "SupabaseRepo", path: str):
+        self._repo = repo
+        self._path = path
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        fut = loop.create_future()
+        self._queue.put_nowait((body, fut))
+        return await fut
+
+    async def aclose(self) -> None:
+        """Stop the flusher and fail every row not yet sent, so no submit() hangs."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            if task.get_loop() is asyncio.get_running_loop():
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("SupabaseRepo closed before the upsert was sent"))
+
+    async def _run(self) -> None:
+        batch = []
+        try:
+            await self._loop(batch)
+        except asyncio.CancelledError:
+            # Closed mid-batch: the rows may or may not have landed
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(RuntimeError("SupabaseRepo closed while the upsert was in flight"))
+            raise
+
+    async def _loop(self, batch: list) -> None:
+        loop = asyncio.get_running_loop()
+        cfg = self._repo.cfg
+        while True:
+            batch.clear()
+            batch.append(await self._queue.get())
+            while len(batch) < cfg.upsert_batch_max_rows and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if len(batch) == 1:
+                # No concurrent traffic: don't make a single webhook wait out the linger
+                await self._flush(batch)
+                continue
+            deadline = loop.time() + cfg.upsert_linger_seconds
+            while len(batch) < cfg.upsert_batch_max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _post(self, rows) -> list:
+        resp = await self._repo._request(
+            "POST", self._path, json_body=rows,
+            expected=(200, 201), headers=_UPSERT_HEADERS,
+        )
+        return resp.json() or []
+
+    async def _flush(self, batch) -> None:
+        # One row per conflict key: PostgREST rejects a bulk upsert that hits the same key twice
+        merged: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+        for body, _ in batch:
+            k = _upsert_key(body)
+            merged[k] = {**merged[k], **body} if k in merged else body
+        # ...and a bulk body whose objects don't share one key set (PGRST102), so rows
+        # from callers that left different optional fields unset go in separate POSTs
+        groups: Dict[frozenset, Dict[Tuple[Any, Any], Dict[str, Any]]] = {}
+        for k, row in merged.items():
+            groups.setdefault(frozenset(row), {})[k] = row
+        outcomes = await asyncio.gather(
+            *(self._post(list(g.values())) for g in groups.values()), return_exceptions=True
+        )
+        results: Dict[Tuple[Any, Any], Any] = {}
+        for g, out in zip(groups.values(), outcomes):
+            if isinstance(out, BaseException):
+                results.update(dict.fromkeys(g, out))
+                continue
+            by_key = {_upsert_key(r): r for r in out if isinstance(r, dict)}
+            only = out[0] if len(out) == 1 else {}
+            for k in g:
+                results[k] = by_key.get(k, only)
+        for body, fut in batch:
+            if fut.done():
+                continue
+            result = results[_upsert_key(body)]
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
 
 class SupabaseRepo:
     """
-    Thin HTTP repo against PostgREST with:
-    - Idempotent UPSERTs using on_conflict=(provider_ref,direction)
+    Thin async HTTP repo against PostgREST with:
+    - One pooled keep-alive httpx.AsyncClient (HTTP/2) per repo
+    - Idempotent UPSERTs using on_conflict=(provider_ref,direction), coalesced
+      into array POSTs under concurrency
     - Exponential backoff for retryable HTTP statuses
     """
 
-    def __init__(self, cfg: Optional[SupabaseRepoConfig] = None):
+    def __init__(
+        self,
+        cfg: Optional[SupabaseRepoConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
         self.cfg = cfg or SupabaseRepoConfig.from_env()
-        self._session = requests.Session()
         self._common_headers = {
             "apikey": self.cfg.service_key,
             "Authorization": f"Bearer {self.cfg.service_key}",
@@ -50,39 +190,66 @@ class SupabaseRepo:
             "Accept-Profile": self.cfg.schema,
             "Content-Type": "application/json",
         }
+        self._client = client or httpx.AsyncClient(
+            base_url=self.cfg.base_url,
+            headers=self._common_headers,
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=self.cfg.max_connections,
+                max_connections=self.cfg.max_connections,
+            ),
+            timeout=self.cfg.timeout_seconds,
+        )
+        self._message_buf = _UpsertBatcher(self, "/rest/v1/message" + _UPSERT_QUERY)
+        self._event_buf = _UpsertBatcher(self, "/rest/v1/event" + _UPSERT_QUERY)
+
+    async def aclose(self) -> None:
+        await self._message_buf.aclose()
+        await self._event_buf.aclose()
+        await self._client.aclose()
 
     # -------------------- internal helpers --------------------
 
-    def _backoff_sleep(self, attempt: int):
-        # attempt: 1..N
-        delay = self.cfg.base_backoff_seconds * (2 ** (attempt - 1))
-        time.sleep(delay)
+    async def _backoff_sleep(self, prev_delay: float, retry_after: Optional[str] = None) -> float:
+        """
+        Sleep before a retry and return the delay used. Honors a numeric
+        Retry-After; otherwise decorrelated jitter so concurrent callers
+        hitting the same endpoint do not retry in lockstep.
+        """
+        base = self.cfg.base_backoff_seconds
+        delay = None
+        if retry_after:
+            try:
+                delay = min(max(float(retry_after), 0.0), MAX_RETRY_AFTER_SECONDS)
+            except ValueError:  # HTTP-date form: fall back to jitter
+                pass
+        if delay is None:
+            delay = random.uniform(base, max(base, min(self.cfg.max_backoff_seconds, prev_delay * 3)))
+        await asyncio.sleep(delay)
+        return delay
 
-    def _request(
+    async def _request(
         self,
         method: str,
         path: str,
         *,
         params: Optional[Dict[str, Any]] = None,
-        json_body: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Any] = None,
         expected: Sequence[int] = (200, 201, 204),
-    ) -> requests.Response:
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
         url = f"{self.cfg.base_url}{path}"
+        delay = self.cfg.base_backoff_seconds
+        content = orjson.dumps(json_body, option=_ORJSON_OPTS) if json_body is not None else None
         for attempt in range(1, self.cfg.max_attempts + 1):
-            resp = self._session.request(
-                method,
-                url,
-                headers=self._common_headers,
-                params=params,
-                json=json_body,
-                timeout=self.cfg.timeout_seconds,
-            )
+            resp = await self._client.request(method, path, params=params, content=content, headers=headers)
             # Success?
             if resp.status_code in expected:
                 return resp
             # Retry?
             if resp.status_code in RETRYABLE and attempt < self.cfg.max_attempts:
-                self._backoff_sleep(attempt)
+                retry_after = resp.headers.get("Retry-After") if resp.status_code in (429, 503) else None
+                delay = await self._backoff_sleep(delay, retry_after)
                 continue
             # Fail
             raise RuntimeError(
@@ -91,84 +258,74 @@ class SupabaseRepo:
         # Should never get here
         raise RuntimeError("unreachable")
 
+    async def _select_json(self, path: str, params: Dict[str, Any]) -> Any:
+        return (await self._request("GET", path, params=params)).json()
+
     # -------------------- public APIs --------------------
 
-    def log_outbound(self, msg: MessageDTO) -> Dict[str, Any]:
+    async def _upsert(self, batcher: _UpsertBatcher, body: Dict[str, Any]) -> Dict[str, Any]:
+        if self.cfg.upsert_batching:
+            return await batcher.submit(body)
+        data = (await self._request(
+            "POST", batcher._path, json_body=body,
+            expected=(200, 201), headers=_UPSERT_HEADERS,
+        )).json()
+        return data[0] if isinstance(data, list) and data else data
+
+    async def log_outbound(self, msg: MessageDTO) -> Dict[str, Any]:
         """
         Idempotent UPSERT into dev_nexus.message using (provider_ref, direction).
         """
-        body = msg.model_dump(exclude_none=True)
-        # PostgREST upsert: POST + Prefer: resolution=merge-duplicates + on_conflict
-        headers = {**self._common_headers, "Prefer": "return=representation,resolution=merge-duplicates"}
-        path = "/rest/v1/message"
-        params = {"on_conflict": "provider_ref,direction"}
-        resp = self._session.post(
-            f"{self.cfg.base_url}{path}",
-            headers=headers,
-            params=params,
-            json=body,
-            timeout=self.cfg.timeout_seconds,
-        )
-        if resp.status_code in (200, 201):
-            data = resp.json()
-            return data[0] if isinstance(data, list) and data else data
-        if resp.status_code in RETRYABLE:
-            # one-shot retry loop using the common method (keeps code simple)
-            return self._request("POST", path, params=params, json_body=body, expected=(200, 201)).json()[0]
-        raise RuntimeError(f"Failed UPSERT message: {resp.status_code} {resp.text}")
-
-    def log_inbound(self, evt: EventDTO) -> Dict[str, Any]:
+        return await self._upsert(self._message_buf, msg.model_dump(exclude_none=True))
+
+    async def log_inbound(self, evt: EventDTO) -> Dict[str, Any]:
         """
         Idempotent UPSERT into dev_nexus.event using (provider_ref, direction).
         """
-        body = evt.model_dump(exclude_none=True)
-        headers = {**self._common_headers, "Prefer": "return=representation,resolution=merge-duplicates"}
-        path = "/rest/v1/event"
-        params = {"on_conflict": "provider_ref,direction"}
-        resp = self._session.post(
-            f"{self.cfg.base_url}{path}",
-            headers=headers,
-            params=params,
-            json=body,
-            timeout=self.cfg.timeout_seconds,
-        )
-        if resp.status_code in (200, 201):
-            data = resp.json()
-            return data[0] if isinstance(data, list) and data else data
-        if resp.status_code in RETRYABLE:
-            return self._request("POST", path, params=params, json_body=body, expected=(200, 201)).json()[0]
-        raise RuntimeError(f"Failed UPSERT event: {resp.status_code} {resp.text}")
-
-    def get_enrollment_status(self, enrollment_id: str) -> EnrollmentStatusDTO:
+        return await self._upsert(self._event_buf, evt.model_dump(exclude_none=True))
+
+    async def get_enrollment_status(self, enrollment_id: str) -> EnrollmentStatusDTO:
         """
         Deterministic status: if has outcome -> 'completed'; elif has handoff -> 'handoff'; else enrollment.status or 'unknown'.
+        One RPC round trip (dev_nexus.enrollment_status); falls back to table selects
+        where the function has not been deployed yet (PostgREST 404).
         """
-        # enrollment
-        enr = self._request(
-            "GET",
-            "/rest/v1/enrollment",
-            params={"id": f"eq.{enrollment_id}", "select": "id,status"},
-        ).json()
+        resp = await self._request(
+            "POST",
+            "/rest/v1/rpc/enrollment_status",
+            json_body={"eid": enrollment_id},
+            expected=(200, 404),
+            headers={"Content-Profile": self.cfg.schema},
+        )
+        if resp.status_code == 404:
+            return await self._enrollment_status_via_selects(enrollment_id)
+        rows = resp.json()
+        return self._status_dto(enrollment_id, rows[0] if rows else None)
+
+    async def _enrollment_status_via_selects(self, enrollment_id: str) -> EnrollmentStatusDTO:
+        # Enrollment, outcome and handoff lookups are independent: one RTT, not three
+        enr, oc, ho = await asyncio.gather(
+            self._select_json("/rest/v1/enrollment", {"id": f"eq.{enrollment_id}", "select": "id,status"}),
+            self._select_json("/rest/v1/outcome", {"enrollment_id": f"eq.{enrollment_id}", "select": "id", "limit": 1}),
+            self._select_json("/rest/v1/handoff", {"enrollment_id": f"eq.{enrollment_id}", "select": "id", "limit": 1}),
+        )
         if not enr:
+            return self._status_dto(enrollment_id, None)
+        return self._status_dto(
+            enrollment_id, {"status": enr[0].get("status"), "has_outcome": bool(oc), "has_handoff": bool(ho)}
+        )
+
+    @staticmethod
+    def _status_dto(enrollment_id: str, row: Optional[Dict[str, Any]]) -> EnrollmentStatusDTO:
+        """row: {status, has_outcome, has_handoff}, or None when the enrollment does not exist."""
+        if row is None:
             return EnrollmentStatusDTO(
                 enrollment_id=enrollment_id, status="unknown", has_outcome=False, has_handoff=False, computed="unknown"
             )
-        status = enr[0].get("status") or "unknown"
-        # outcome?
-        oc = self._request(
-            "GET",
-            "/rest/v1/outcome",
-            params={"enrollment_id": f"eq.{enrollment_id}", "select": "id", "limit": 1},
-        ).json()
-        # handoff?
-        ho = self._request(
-            "GET",
-            "/rest/v1/handoff",
-            params={"enrollment_id": f"eq.{enrollment_id}", "select": "id", "limit": 1},
-        ).json()
-        has_outcome = bool(oc)
-        has_handoff = bool(ho)
-        computed = "completed" if has_outcome else ("handoff" if has_handoff else (status if status else "unknown"))
+        status = row.get("status") or "unknown"
+        has_outcome = bool(row.get("has_outcome"))
+        has_handoff = bool(row.get("has_handoff"))
+        computed = "completed" if has_outcome else ("handoff" if has_handoff else status)
         return EnrollmentStatusDTO(
             enrollment_id=enrollment_id,
             status=status,
@@ -177,7 +334,7 @@ class SupabaseRepo:
             computed=computed,  # deterministic mapping
         )
 
-    def link_ref_to_workflow(self, link: LinkRefDTO) -> Dict[str, Any]:
+    async def link_ref_to_workflow(self, link: LinkRefDTO) -> Dict[str, Any]:
         """
         Record a linkage event (type='link') tying a provider_ref to a workflow/execution id.
         Idempotent on (provider_ref, direction='outbound') so multiple calls do not duplicate.
@@ -189,4 +346,4 @@ class SupabaseRepo:
             project_id=link.project_id,
             data={"workflow_id": link.workflow_id, "notes": link.notes} if link.notes else {"workflow_id": link.workflow_id},
         )
-        return self.log_inbound(evt)
+        return await self.log_inbound(evt)
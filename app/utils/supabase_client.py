@@ -1,8 +1,48 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+import httpx
 import os
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or SUPABASE_KEY
+
+# Shared keep-alive PostgREST session for async request handlers (one pool per
+# process instead of a client + TLS handshake per webhook); the web app exposes
+# it as app.state.http. None when unconfigured.
+ASYNC_CLIENT: httpx.AsyncClient | None = (
+    httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": SUPABASE_SERVICE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+            "Content-Type": "application/json",
+        },
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=15,
+    )
+    if SUPABASE_URL and SUPABASE_SERVICE_KEY
+    else None
+)
+
+
+async def close_async_client() -> None:
+    if ASYNC_CLIENT is not None:
+        await ASYNC_CLIENT.aclose()
+
+def create_pooled_client(url: str, key: str) -> Client:
+    """
+    Sync supabase client for webhook modules (queries run via asyncio.to_thread).
+    One explicitly sized HTTP/2 keep-alive pool, shared by those worker threads,
+    instead of supabase-py's default-sized one.
+    """
+    http = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30),
+        timeout=10.0,
+        follow_redirects=True,
+    )
+    return create_client(url, key, options=ClientOptions(httpx_client=http))
 
 def get_client() -> Client:
     return create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -1,16 +1,17 @@
 # app/web/email_webhook.py
 
-from fastapi import APIRouter, Request, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Request, Response, HTTPException, Header
 from datetime import datetime, timezone
+import asyncio
 import hmac
-import hashlib
 import logging
 import os
+import re
 
-from supabase import create_client, Client
+import orjson
 
+from app.utils.supabase_client import ASYNC_CLIENT as supabase_http
 from app.web.schemas import WebhookEvent
-from app.agents.conversational_response_agent import ConversationalResponseAgent
 
 router = APIRouter()
 logger = logging.getLogger("cory.email_webhook")
@@ -19,22 +20,42 @@ logger = logging.getLogger("cory.email_webhook")
 # 🔐 Secret & Supabase setup
 # --------------------------------------------------------------------------
 EMAIL_WEBHOOK_SECRET = os.getenv("EMAIL_WEBHOOK_SECRET", "dev-secret")
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
-supabase: Client | None = None
-if SUPABASE_URL and SUPABASE_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-else:
+_SECRET_BYTES = EMAIL_WEBHOOK_SECRET.encode()
+# Exactly what hexdigest() emits; bytes.fromhex alone would also accept
+# uppercase and embedded whitespace
+_SIG_HEX = re.compile(r"[0-9a-f]{64}")
+# Set to "0" to skip inbound intent classification (and the agent import) entirely
+EMAIL_INTENT_CLASSIFY_ENABLED = os.getenv("EMAIL_INTENT_CLASSIFY_ENABLED", "1") == "1"
+# Max in-flight process_event_fn calls dispatched after the ACK
+EVENT_DISPATCH_CONCURRENCY = int(os.getenv("EMAIL_EVENT_DISPATCH_CONCURRENCY", "64"))
+
+if supabase_http is None:
     logger.warning(
         "Supabase credentials not set; email intent classification → lead_campaign_steps will be disabled."
     )
 
 
+async def _update_latest_step_by_email(email: str, intent: str, next_action: str | None) -> str | None:
+    """
+    Stamp intent + next_action on the latest lead_campaign_steps row for the
+    contact with this email (contact -> enrollment -> step resolved server-side,
+    see sql/migrations/0035). Returns the step id, or None if nothing matched.
+    """
+    r = await supabase_http.post(
+        "/rpc/update_latest_step_by_email",
+        json={"email": email, "intent": intent, "next_action": next_action},
+    )
+    r.raise_for_status()
+    return r.json()
+
+
 def verify_hmac_signature(body_bytes: bytes, signature: str) -> bool:
-    mac = hmac.new(EMAIL_WEBHOOK_SECRET.encode(), body_bytes, hashlib.sha256)
-    expected = mac.hexdigest()
-    return hmac.compare_digest(expected, signature)
+    # Compare raw digests (no hex encode); anything but canonical hex is a mismatch
+    if not _SIG_HEX.fullmatch(signature):
+        return False
+    sig_bytes = bytes.fromhex(signature)
+    # One-shot C digest (OpenSSL fast path); secret encoded once at import
+    return hmac.compare_digest(hmac.digest(_SECRET_BYTES, body_bytes, "sha256"), sig_bytes)
 
 
 # --------------------------------------------------------------------------
@@ -48,90 +69,36 @@ async def _classify_and_update_campaign_step_email(
     """
     Use ConversationalResponseAgent to classify an inbound Email and stamp
     intent + next_action onto the latest lead_campaign_steps row for the
-    associated enrollment (resolved via contact.email).
+    associated enrollment (resolved via contact.email, server-side).
 
     Returns the classification dict, or None if classification wasn't possible.
     """
     if not inbound_text or not from_email:
         return None
-    if supabase is None:
+    if supabase_http is None:
         # No DB access configured; nothing we can do here
         return None
 
     try:
-        # 1️⃣ Classify the inbound text
-        agent = ConversationalResponseAgent()
-        classification = await agent.classify_message(inbound_text, channel="email")
+        # 1️⃣ Classify the inbound text (agent imported lazily; cold paths never load it)
+        from app.agents.conversational_response_agent import get_conversational_agent
+
+        classification = await get_conversational_agent().classify_message(inbound_text, channel="email")
 
         intent = classification.get("intent")
         next_action = classification.get("next_action")
         if not intent:
             return classification
 
-        # 2️⃣ Resolve contact by email
-        contact_res = (
-            supabase.table("contact")
-            .select("id")
-            .eq("email", from_email)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not contact_res.data:
+        # 2️⃣ Update the latest campaign step for this email (one RPC)
+        step_id = await _update_latest_step_by_email(from_email, intent, next_action)
+        if not step_id:
             logger.info(
-                "[email_webhook] No contact found for email %s; skipping campaign_step update",
+                "[email_webhook] No lead_campaign_steps found for email %s; skipping",
                 from_email,
             )
             return classification
 
-        contact_id = contact_res.data[0]["id"]
-
-        # 3️⃣ Get most recent enrollment for this contact
-        enr_res = (
-            supabase.table("enrollment")
-            .select("id, registration_id")
-            .eq("contact_id", contact_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not enr_res.data:
-            logger.info(
-                "[email_webhook] No enrollment found for contact %s; skipping campaign_step update",
-                contact_id,
-            )
-            return classification
-
-        enrollment = enr_res.data[0]
-        registration_id = enrollment["registration_id"]
-
-        # 4️⃣ Find most recent campaign step for this registration
-        step_res = (
-            supabase.table("lead_campaign_steps")
-            .select("id")
-            .eq("registration_id", registration_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not step_res.data:
-            logger.info(
-                "[email_webhook] No lead_campaign_steps found for registration %s; skipping",
-                registration_id,
-            )
-            return classification
-
-        step_id = step_res.data[0]["id"]
-
-        # 5️⃣ Update intent + next_action on that step
-        supabase.table("lead_campaign_steps").update(
-            {
-                "intent": intent,
-                "next_action": next_action,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }
-        ).eq("id", step_id).execute()
-
         logger.info(
             "[email_webhook] Updated lead_campaign_steps | email=%s step_id=%s intent=%s next_action=%s",
             from_email,
@@ -152,15 +119,49 @@ async def _classify_and_update_campaign_step_email(
 # --------------------------------------------------------------------------
 # 📩 Webhook Endpoint
 # --------------------------------------------------------------------------
-@router.post("/webhooks/email")
-async def email_webhook(request: Request, x_signature: str = Header(None)):
+async def _dispatch_event(app, event: WebhookEvent) -> None:
+    """
+    Run the downstream pipeline after the ACK, bounded by app.state.event_dispatch_sem.
+    On failure the provider_ref reservation is released so a redelivery is not
+    rejected as a duplicate.
+    """
+    sem = getattr(app.state, "event_dispatch_sem", None)
+    if sem is None:
+        sem = app.state.event_dispatch_sem = asyncio.Semaphore(EVENT_DISPATCH_CONCURRENCY)
+    provider_ref = event.metadata.get("provider_ref")
+    try:
+        async with sem:
+            await app.state.process_event_fn("email", event)
+    except Exception as e:  # noqa: BLE001
+        logger.warning(
+            "⚠️ Email event dispatch failed",
+            extra={"error": str(e), "provider_ref": provider_ref},
+        )
+        await app.state.idempotency.release(provider_ref)
+
+
+@router.post("/webhooks/email", status_code=202)
+async def email_webhook(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    x_signature: str = Header(None),
+):
+    # Fast path for provider retries: a ref we already processed is ACKed
+    # before hashing/parsing the body. Read-only check, so unsigned requests
+    # can never reserve (and thereby suppress) a ref.
+    header_ref = request.headers.get("X-Provider-Ref")
+    if header_ref and await request.app.state.idempotency.seen(header_ref):
+        response.status_code = 200
+        return {"status": "duplicate", "provider_ref": header_ref}
+
     # Read raw body for HMAC verification
     body_bytes = await request.body()
     if not x_signature or not verify_hmac_signature(body_bytes, x_signature):
         raise HTTPException(status_code=401, detail="Invalid signature")
 
-    # Parse JSON payload
-    payload = await request.json()
+    # Parse JSON payload from the bytes already read for HMAC (no second body read)
+    payload = orjson.loads(body_bytes)
     provider_ref = (
         payload.get("provider_ref")
         or payload.get("message_id")
@@ -188,10 +189,11 @@ async def email_webhook(request: Request, x_signature: str = Header(None)):
 
     classification: dict | None = None
     try:
-        classification = await _classify_and_update_campaign_step_email(
-            inbound_text=inbound_text,
-            from_email=from_email,
-        )
+        if EMAIL_INTENT_CLASSIFY_ENABLED:
+            classification = await _classify_and_update_campaign_step_email(
+                inbound_text=inbound_text,
+                from_email=from_email,
+            )
     except Exception as e:  # extra safety
         logger.warning(
             "⚠️ Failed Email intent classification pipeline",
@@ -206,6 +208,7 @@ async def email_webhook(request: Request, x_signature: str = Header(None)):
         logger.info(
             "Duplicate email webhook ignored", extra={"provider_ref": provider_ref}
         )
+        response.status_code = 200
         return {"status": "duplicate", "provider_ref": provider_ref, "data": payload}
 
     # Normalize into canonical WebhookEvent
@@ -223,8 +226,8 @@ async def email_webhook(request: Request, x_signature: str = Header(None)):
         },
     )
 
-    # Continue existing processing pipeline
-    await request.app.state.process_event_fn("email", event)
+    # Continue existing processing pipeline after the 202 ACK (non-blocking)
+    background_tasks.add_task(_dispatch_event, request.app, event)
 
     return {
         "status": "received",
@@ -1,30 +1,78 @@
 # app/web/idempotency_cache.py
 import asyncio
+import logging
 from cachetools import TTLCache
 
+logger = logging.getLogger(__name__)
+
+
 class IdempotencyCache:
-    """Simple in-memory idempotency cache with TTL."""
+    """
+    Idempotency cache with TTL.
+
+    With a Redis client, reserve() is a single `SET key 1 EX ttl NX`, so the
+    check-and-reserve is atomic across every uvicorn worker. Without one (or
+    if Redis errors), it falls back to the in-process TTLCache, which only
+    dedupes within this worker.
+    """
 
-    def __init__(self, ttl_seconds: int = 300, maxsize: int = 1000):
+    KEY_PREFIX = "idemp:"
+
+    def __init__(self, ttl_seconds: int = 300, maxsize: int = 1000, redis=None):
+        self._ttl = ttl_seconds
+        self._redis = redis
         self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
         self._lock = asyncio.Lock()
 
     async def reserve(self, key: str) -> bool:
         """Return True if key is new and reserved; False if duplicate."""
+        if self._redis is not None:
+            try:
+                return bool(await self._redis.set(self.KEY_PREFIX + key, "1", ex=self._ttl, nx=True))
+            except Exception as e:
+                logger.warning("IdempotencyRedisUnavailable", extra={"error": str(e)})
         async with self._lock:
             if key in self._cache:
                 return False
             self._cache[key] = True
             return True
 
+    async def release(self, key: str) -> None:
+        """Drop a reservation so a provider redelivery is processed again (e.g. after a failed dispatch)."""
+        if self._redis is not None:
+            try:
+                await self._redis.delete(self.KEY_PREFIX + key)
+            except Exception as e:
+                logger.warning("IdempotencyRedisUnavailable", extra={"error": str(e)})
+        async with self._lock:
+            self._cache.pop(key, None)
+
+    async def seen(self, key: str) -> bool:
+        """Read-only check: True if key is already reserved. Never reserves."""
+        if self._redis is not None:
+            try:
+                return bool(await self._redis.exists(self.KEY_PREFIX + key))
+            except Exception as e:
+                logger.warning("IdempotencyRedisUnavailable", extra={"error": str(e)})
+        return key in self._cache
+
+    async def cleanup(self) -> None:
+        """Evict expired in-process entries now (TTLCache otherwise expires lazily on writes)."""
+        async with self._lock:
+            self._cache.expire()
+
+    @property
+    def ttl_seconds(self) -> int:
+        return self._ttl
+
     def count(self, key: str | None = None) -> int:
-        """Return count of all keys, or 1 if a specific key exists."""
+        """Return count of all keys, or 1 if a specific key exists (in-process entries only)."""
         if key is None:
             return len(self._cache)
         return 1 if key in self._cache else 0
 
     def clear(self):
-        """Clear all entries from cache (used in tests)."""
+        """Clear all in-process entries from cache (used in tests)."""
         self._cache.clear()
 
     def __len__(self):
@@ -1,44 +1,88 @@
 # app/web/middleware.py
-import uuid
 import time
-from fastapi import Request
-from typing import Callable
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.web import metrics as metrics_mod
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        response: Response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        return response
-
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        start = time.time()
-
-        # Count every request
-        metrics_mod.WEBHOOK_TOTAL.labels(method=request.method, path=request.url.path).inc()
-
-        response = await call_next(request)
-
-        # Measure latency
-        latency = time.time() - start
-        metrics_mod.WEBHOOK_LATENCY.observe(latency)
-
-        # Status counters
-        status = response.status_code
-        if 200 <= status < 300:
-            metrics_mod.WEBHOOK_2XX.inc()
-        elif 400 <= status < 500:
-            metrics_mod.WEBHOOK_4XX.inc()
-
-        return response
-    
-def setup_middleware(app: FastAPI):
-    """Attach all middlewares (like Request ID) to FastAPI app."""
-    app.add_middleware(RequestIDMiddleware)
-    app.add_middleware(MetricsMiddleware)
 
+try:  # Rust-backed uuid4 (much cheaper per request); stdlib fallback
+    from uuid_utils import uuid4 as _uuid4
+except Exception:  # pragma: no cover
+    from uuid import uuid4 as _uuid4
+
+# WEBHOOK_TOTAL children keyed by (method, route template). Labelling by the
+# matched route (not the raw path) keeps ids out of the series; unmatched
+# paths share one label so scanners can't grow it. Methods outside the
+# standard set are likewise folded into one "OTHER" label.
+_TOTAL_CHILDREN: dict = {}
+_UNMATCHED = "<unmatched>"
+_KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+_OTHER_METHOD = "OTHER"
+# Liveness/readiness/scrape probes: still get a request id, but no metrics
+_PROBE_PATHS = frozenset({"/healthz", "/readyz", "/metrics"})
+
+
+def _count_request(scope: Scope) -> None:
+    route = scope.get("route")
+    path = scope.get("root_path", "") + route.path if getattr(route, "path", None) else _UNMATCHED
+    method = scope["method"]
+    key = (method if method in _KNOWN_METHODS else _OTHER_METHOD, path)
+    child = _TOTAL_CHILDREN.get(key)
+    if child is None:
+        child = _TOTAL_CHILDREN[key] = metrics_mod.WEBHOOK_TOTAL.labels(method=key[0], path=key[1])
+    child.inc()
+
+
+# Single pure ASGI middleware: no BaseHTTPMiddleware task group / memory
+# stream per request, and one `send` wrapper for request id + metrics.
+
+
+class ObservabilityMiddleware:
+    """Request id (state + X-Request-ID header) and Prometheus webhook metrics in one pass."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        request_id = str(_uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id  # -> request.state.request_id
+        header = (b"x-request-id", request_id.encode())
+
+        # Probes skip metrics entirely (treated as already counted)
+        counted = scope["path"] in _PROBE_PATHS
+
+        async def send_wrapper(message: Message):
+            nonlocal counted
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+                if counted:
+                    return await send(message)
+
+                # Count every request (routing has resolved scope["route"] by now)
+                _count_request(scope)
+                counted = True
+
+                # Latency to response start (excludes body streaming / background tasks)
+                metrics_mod.WEBHOOK_LATENCY.observe(time.perf_counter() - start)
+
+                # Status counters
+                status = message["status"]
+                if 200 <= status < 300:
+                    metrics_mod.WEBHOOK_2XX.inc()
+                elif 400 <= status < 500:
+                    metrics_mod.WEBHOOK_4XX.inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not counted:  # app raised before starting a response
+                _count_request(scope)
+
+
+def setup_middleware(app: FastAPI):
+    """Attach all middlewares (request id + metrics) to FastAPI app."""
+    app.add_middleware(ObservabilityMiddleware)
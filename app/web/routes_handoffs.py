@@ -3,12 +3,11 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 from uuid import UUID
 
 from app.repo.handoff_repo import HandoffRepo
-# If you already expose a DB pool dependency, import it instead:
-# from app.data.db_pg import get_pool  # <- preferred if available
+# app.state.db_pool is opened by create_app() (app.data.db_pg.init_db_pool) when DATABASE_URL is set
 
 router = APIRouter(prefix="/api/v1/handoffs", tags=["handoffs"])
 
@@ -26,6 +25,13 @@ async def get_pool(request: Request):
         raise RuntimeError("DB pool not initialized on app.state.db_pool")
     return pool
 
+async def get_repo(request: Request, pool = Depends(get_pool)) -> HandoffRepo:
+    """One HandoffRepo per app (cached on app.state), rebuilt only if the pool changes."""
+    repo = getattr(request.app.state, "handoff_repo", None)
+    if repo is None or repo.pool is not pool:
+        repo = request.app.state.handoff_repo = HandoffRepo(pool)
+    return repo
+
 class Identity(BaseModel):
     organization_id: UUID
     user_id: UUID
@@ -57,7 +63,7 @@ class HandoffCreateRequest(BaseModel):
     lead_id: Optional[UUID] = None
     interaction_id: Optional[UUID] = None
     description: Optional[str] = None
-    priority: str = Field("normal", pattern=r"^(low|normal|high|urgent)$")
+    priority: Literal["low", "normal", "high", "urgent"] = "normal"
     assigned_to: Optional[UUID] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
@@ -92,9 +98,8 @@ class HandoffResponse(BaseModel):
 async def create_handoff(
     body: HandoffCreateRequest,
     ident: Identity = Depends(get_identity),
-    pool = Depends(get_pool),
+    repo: HandoffRepo = Depends(get_repo),
 ):
-    repo = HandoffRepo(pool)
     rec = await repo.create(
         organization_id=ident.organization_id,
         title=body.title,
@@ -117,9 +122,8 @@ async def resolve_handoff(
     handoff_id: UUID,
     body: ResolveRequest,
     ident: Identity = Depends(get_identity),
-    pool = Depends(get_pool),
+    repo: HandoffRepo = Depends(get_repo),
 ):
-    repo = HandoffRepo(pool)
     # Optional: record first response timestamp when resolver acts
     await repo.mark_first_response(handoff_id=handoff_id)
     rec = await repo.resolve(
@@ -136,9 +140,8 @@ async def resolve_handoff(
 async def get_handoff(
     handoff_id: UUID,
     ident: Identity = Depends(get_identity),
-    pool = Depends(get_pool),
+    repo: HandoffRepo = Depends(get_repo),
 ):
-    repo = HandoffRepo(pool)
     rec = await repo.get(handoff_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Not found")
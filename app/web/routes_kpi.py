@@ -1,15 +1,62 @@
+import asyncio
 import os
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, Request, Response
 from supabase import create_client
 
 router = APIRouter(prefix="/api/v1/kpi", tags=["kpi"])
 
-# module-level client for simplicity; tests can monkeypatch this
-_sb = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+# lazily created on first request and reused; tests can monkeypatch this
+_sb = None
+
+
+def _client():
+    global _sb
+    if _sb is None:
+        _sb = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+    return _sb
+
+_KPI_RPCS = ("rpc_kpi_latency_p95", "rpc_kpi_deliverability", "rpc_kpi_response_by_variant")
+
+# Dashboards poll this endpoint; serve one computed result per TTL window
+_CACHE_TTL = float(os.getenv("KPI_CACHE_TTL", "15"))
+_cache = {"ts": 0.0, "val": None}
+_cache_lock = asyncio.Lock()
+
+
+def _rpc_data(sb, name: str):
+    return sb.rpc(name, {}).execute().data
+
+
+async def _rpc_http(http, name: str):
+    r = await http.post(f"/rpc/{name}", content=b"{}")
+    r.raise_for_status()
+    return r.json()
+
+
+async def _fetch_all(http):
+    # The three RPCs are independent: run them concurrently (one RTT, not three)
+    if _sb is None and http is not None:
+        # Shared app-wide pool (app.state.http): no extra client / TLS handshakes
+        return await asyncio.gather(*(_rpc_http(http, n) for n in _KPI_RPCS))
+    sb = _client()  # resolved on the loop, not racily inside the worker threads
+    return await asyncio.gather(*(asyncio.to_thread(_rpc_data, sb, n) for n in _KPI_RPCS))
+
+
+def _fresh():
+    return _cache["val"] is not None and time.monotonic() - _cache["ts"] < _CACHE_TTL
+
 
 @router.get("")
-def kpis():
-    p95  = _sb.rpc("public.rpc_kpi_latency_p95", {}).execute().data if False else _sb.rpc("rpc_kpi_latency_p95", {}).execute().data
-    deliv= _sb.rpc("rpc_kpi_deliverability", {}).execute().data
-    resp = _sb.rpc("rpc_kpi_response_by_variant", {}).execute().data
-    return {"latency_p95": p95, "deliverability": deliv, "response_by_variant": resp}
+async def kpis(request: Request, response: Response):
+    response.headers["Cache-Control"] = f"public, max-age={int(_CACHE_TTL)}"
+    if _fresh():
+        return _cache["val"]
+    async with _cache_lock:
+        # Another request may have refreshed while we waited (stampede coalescing)
+        if _fresh():
+            return _cache["val"]
+        p95, deliv, resp = await _fetch_all(getattr(request.app.state, "http", None))
+        val = {"latency_p95": p95, "deliverability": deliv, "response_by_variant": resp}
+        _cache.update(ts=time.monotonic(), val=val)
+        return val
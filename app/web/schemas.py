@@ -3,7 +3,33 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, Optional, Literal
 from uuid import UUID
-from pydantic import BaseModel, Field, ValidationError, model_validator
+import orjson
+from pydantic import BaseModel, Field, model_validator
+
+__all__ = [
+    "DEFAULT_WORKFLOW_ID",
+    "WebhookEvent",
+    "EmailWebhookEvent",
+    "SmsWebhookEvent",
+    "VoiceWebhookEvent",
+    "normalize_webhook_event",
+    "normalize_webhook_event_json",
+]
+
+
+DEFAULT_WORKFLOW_ID = "default-workflow"
+
+
+def _infer_channel(payload: Any) -> str:
+    """Channel implied by payload keys when the sender omits `channel`."""
+    if isinstance(payload, dict):
+        if "email" in payload or "subject" in payload:
+            return "email"
+        if "phone" in payload or "message" in payload:
+            return "sms"
+        if "call_id" in payload or "transcript" in payload:
+            return "voice"
+    return "webhook"
 
 
 # --------------------------------------------------------------------
@@ -22,6 +48,19 @@ class WebhookEvent(BaseModel):
 
     model_config = {"extra": "forbid"}  # reject unexpected top-level keys
 
+    @property
+    def workflow_id(self) -> str:
+        """
+        Target workflow: first non-empty `workflow_id` in metadata, then
+        payload, else DEFAULT_WORKFLOW_ID. Not a field, so it never appears in
+        model_dump(), and always reflects the current (e.g. model_copy'd) data.
+        """
+        for source in (self.metadata, self.payload):
+            wf_id = source.get("workflow_id")
+            if wf_id:
+                return wf_id
+        return DEFAULT_WORKFLOW_ID
+
     @model_validator(mode="before")
     def normalize_inputs(cls, v: dict) -> dict:
         """Normalize input variations (e.g. time→timestamp, infer channel)."""
@@ -37,17 +76,8 @@ class WebhookEvent(BaseModel):
             v["timestamp"] = v.pop("time")
 
         # infer channel if missing
-        if "channel" not in v:
-            p = v.get("payload", {})
-            if isinstance(p, dict):
-                if "email" in p or "subject" in p:
-                    v["channel"] = "email"
-                elif "phone" in p or "message" in p:
-                    v["channel"] = "sms"
-                elif "call_id" in p or "transcript" in p:
-                    v["channel"] = "voice"
-                else:
-                    v["channel"] = "webhook"
+        if "channel" not in v and isinstance(v.get("payload", {}), dict):
+            v["channel"] = _infer_channel(v.get("payload", {}))
         return v
 
 
@@ -78,25 +108,36 @@ class VoiceWebhookEvent(WebhookEvent):
 # --------------------------------------------------------------------
 # Normalization factory helper
 # --------------------------------------------------------------------
+# Bound validators per resolved channel; anything else validates as the base model
+_CHANNEL_VALIDATORS = {
+    "email": EmailWebhookEvent.model_validate,
+    "sms": SmsWebhookEvent.model_validate,
+    "voice": VoiceWebhookEvent.model_validate,
+}
+_BASE_VALIDATOR = WebhookEvent.model_validate
+
+
 def normalize_webhook_event(raw: dict) -> WebhookEvent:
     """
-    Try channel-specific validation first, fallback to base WebhookEvent.
+    Validate against the channel-specific model in one pass: the channel is
+    resolved up front (explicit, or inferred from payload keys the same way
+    WebhookEvent.normalize_inputs does), so no fallback validation is needed.
     Raises ValidationError if invalid.
     """
     if not isinstance(raw, dict):
-        raise ValidationError("Invalid payload type")
-
-    channel = (raw.get("channel") or "").lower()
-
-    try:
-        if channel == "email":
-            return EmailWebhookEvent.model_validate(raw)
-        if channel == "sms":
-            return SmsWebhookEvent.model_validate(raw)
-        if channel == "voice":
-            return VoiceWebhookEvent.model_validate(raw)
-        # fallback
-        return WebhookEvent.model_validate(raw)
-    except ValidationError as e:
-        raise e
+        raise TypeError("Invalid payload type")
+
+    channel = raw["channel"] if "channel" in raw else _infer_channel(raw.get("payload", {}))
+    if isinstance(channel, str):
+        channel = channel.lower()
+    return _CHANNEL_VALIDATORS.get(channel, _BASE_VALIDATOR)(raw)
 
+
+def normalize_webhook_event_json(raw: bytes) -> WebhookEvent:
+    """
+    normalize_webhook_event straight from the request body bytes. Parsed once
+    with orjson: the channel may have to be inferred from payload keys, so the
+    dict is needed before the model can be picked (pydantic's validate_json
+    would parse a second time).
+    """
+    return normalize_webhook_event(orjson.loads(raw))
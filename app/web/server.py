@@ -15,9 +15,12 @@ else:
     print("[BOOTSTRAP] ⚠️ No .env file found — using system environment")
 
 # 🔹 2. Continue with normal imports AFTER env vars are loaded
+import asyncio
+import time
 import uvicorn
 from datetime import datetime, timezone
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 
 from app.web.middleware import setup_middleware
 from app.web.idempotency_cache import IdempotencyCache
@@ -29,6 +32,7 @@ from app.web.wa_webhook import router as wa_router
 from app.web.routes_handoffs import router as handoffs_router
 from app.web.routes_kpi import router as kpi_router
 from app.web import metrics
+from app.utils.supabase_client import ASYNC_CLIENT, close_async_client
 
 
 # ✅ Temporal bridge (must be imported after .env load)
@@ -40,7 +44,8 @@ from app.orchestrator.temporal import signal_bridge  # sub-app
 # ---------------------------------------------------------------------------
 def create_app() -> FastAPI:
     """Initialize FastAPI web app with all routers, middleware, and bridge."""
-    app = FastAPI(title="Cory Admissions Web API")
+    # orjson renders response bodies (UUID/datetime natively, in C)
+    app = FastAPI(title="Cory Admissions Web API", default_response_class=ORJSONResponse)
 
     # ✅ Mount Temporal bridge (exposes /bridge endpoints)
     app.mount("/bridge", signal_bridge.app)
@@ -59,28 +64,81 @@ def create_app() -> FastAPI:
     app.include_router(metrics.router)
 
     # ✅ Health check
+    # Probes hit this many times a second: the body is rebuilt at most once
+    # per second and returned as pre-rendered bytes (no serialization)
+    healthz_body = [0, b""]
+
     @app.get("/healthz")
-    def healthz():
-        return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
+    async def healthz():
+        now = int(time.time())
+        if now != healthz_body[0]:
+            ts = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+            healthz_body[:] = [now, b'{"status":"ok","timestamp":"%s"}' % ts.encode()]
+        return Response(content=healthz_body[1], media_type="application/json")
+
+    # ✅ Shared outbound HTTP pool (Supabase PostgREST, HTTP/2 keep-alive);
+    # handlers use request.app.state.http instead of opening their own client
+    app.state.http = ASYNC_CLIENT
+
+    @app.on_event("shutdown")
+    async def _close_http():
+        await close_async_client()
+
+    # ✅ Redis (optional): shared idempotency across uvicorn workers
+    app.state.redis = None
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        import redis.asyncio as aioredis
+
+        app.state.redis = aioredis.from_url(redis_url, decode_responses=True)
+
+        @app.on_event("shutdown")
+        async def _close_redis():
+            await app.state.redis.aclose()
+
+    # ✅ Postgres pool (handoff routes read app.state.db_pool); only when DATABASE_URL is set
+    if os.getenv("DATABASE_URL"):
+        from app.data.db_pg import init_db_pool, close_db_pool
+
+        @app.on_event("startup")
+        async def _open_db_pool():
+            app.state.db_pool = await init_db_pool()
+
+        @app.on_event("shutdown")
+        async def _close_db_pool():
+            await close_db_pool()
 
     # ✅ Idempotency cache (shared across webhook handlers)
-    idempotency_cache = IdempotencyCache(ttl_seconds=300)
+    idempotency_cache = IdempotencyCache(ttl_seconds=300, redis=app.state.redis)
     app.state.idempotency = idempotency_cache
     app.state.processed_refs = idempotency_cache
 
+    # ✅ Periodic sweep of expired idempotency entries (every ttl/2)
+    async def _idempotency_cleanup_loop(cache: IdempotencyCache):
+        while True:
+            await asyncio.sleep(cache.ttl_seconds / 2)
+            await cache.cleanup()
+
+    @app.on_event("startup")
+    async def _start_idempotency_cleanup():
+        app.state.idempotency_cleanup_task = asyncio.create_task(
+            _idempotency_cleanup_loop(app.state.idempotency)
+        )
+
+    @app.on_event("shutdown")
+    async def _stop_idempotency_cleanup():
+        task = getattr(app.state, "idempotency_cleanup_task", None)
+        if task is not None:
+            task.cancel()
+
     # ✅ Temporal signal handler bridge
     async def process_event(channel: str, event):
         """
         Send incoming events (SMS/email/etc.) into Temporal workflows.
         """
-        workflow_id = (
-            event.metadata.get("workflow_id")
-            or event.payload.get("workflow_id")
-            or "default-workflow"
-        )
-        event_dict = event.model_dump()
-        success = await send_temporal_signal(workflow_id, event_dict)
-        return success
+        # JSON-native dict straight from pydantic-core (datetime/UUID already
+        # strings), so the signal payload needs no further conversion
+        return await send_temporal_signal(event.workflow_id, event.model_dump(mode="json"))
 
     app.state.process_event_fn = process_event
 
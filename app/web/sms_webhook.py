@@ -1,18 +1,24 @@
 # app/web/sms_webhook.py
 
-from fastapi import APIRouter, Request, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Header
 from datetime import datetime, timezone
+import asyncio
+import functools
 import hmac
 import hashlib
 import logging
 import os
+import re
+import orjson
 import phonenumbers
+from cachetools import TTLCache
 
-from supabase import create_client, Client
+from supabase import Client
 
+from app.utils.supabase_client import create_pooled_client
 from app.web.schemas import WebhookEvent
 from app.orchestrator.temporal.signal_bridge import signal_workflow
-from app.agents.conversational_response_agent import ConversationalResponseAgent
+from app.agents.conversational_response_agent import DEFAULT_NEXT_ACTION, get_conversational_agent
 
 router = APIRouter()
 logger = logging.getLogger("cory.sms_webhook")
@@ -31,14 +37,24 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY
 
 supabase: Client | None = None
 if SUPABASE_URL and SUPABASE_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = create_pooled_client(SUPABASE_URL, SUPABASE_KEY)
 else:
     logger.warning("Supabase credentials missing — inbound SMS DB logging disabled.")
 
 
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _execute(query):
+    """Run a (blocking) supabase-py query in a worker thread, off the event loop."""
+    return await asyncio.to_thread(query.execute)
+
+
 # --------------------------------------------------------------------------
 # 📞 Phone normalization
 # --------------------------------------------------------------------------
+@functools.lru_cache(maxsize=10_000)  # senders repeat; parsing is the costly part
 def normalize_phone(num: str | None) -> str | None:
     if not num:
         return None
@@ -52,74 +68,103 @@ def normalize_phone(num: str | None) -> str | None:
 # --------------------------------------------------------------------------
 # 🛑 STOP / START / HELP compliance
 # --------------------------------------------------------------------------
+_COMPLIANCE_KEYWORDS = {
+    "stop": "stop", "unsubscribe": "stop", "quit": "stop",
+    "start": "start", "unstop": "start",
+    "help": "help",
+}
+
+# One-word replies whose intent is unambiguous: classified without the agent (LLM)
+_QUICK_INTENT = {
+    "yes": "ready_to_enroll", "yes please": "ready_to_enroll", "yep": "ready_to_enroll",
+    "no": "not_interested", "no thanks": "not_interested", "nope": "not_interested",
+    "maybe": "unsure_or_declined", "not sure": "unsure_or_declined",
+    "call me": "callback_requested",
+}
+
+
 def compliance_keyword(text: str) -> str | None:
-    txt = text.strip().lower()
-    if txt in {"stop", "unsubscribe", "quit"}:
-        return "stop"
-    if txt in {"start", "unstop"}:
-        return "start"
-    if txt == "help":
-        return "help"
-    return None
+    return _COMPLIANCE_KEYWORDS.get(text.strip().lower())
 
 
-def set_sms_opt_in(phone: str, enabled: bool):
+async def set_sms_opt_in(phone: str, enabled: bool, now: str | None = None):
     """Uses correct DB column: contact.consent"""
     if supabase is None or not phone:
         return
-    supabase.table("contact").update({
+    await _execute(supabase.table("contact").update({
         "consent": enabled,
-        "last_interaction_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("phone", phone).execute()
+        "last_interaction_at": now or _now_iso(),
+    }).eq("phone", phone))
 
 
-def update_last_interaction(phone: str):
+async def update_last_interaction(phone: str, now: str | None = None):
     """Uses correct DB column: contact.last_interaction_at"""
     if supabase is None or not phone:
         return
-    supabase.table("contact").update({
-        "last_interaction_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("phone", phone).execute()
+    await _execute(supabase.table("contact").update({
+        "last_interaction_at": now or _now_iso(),
+    }).eq("phone", phone))
 
 
 # --------------------------------------------------------------------------
 # 📥 LOG INBOUND MESSAGE → message TABLE
 # --------------------------------------------------------------------------
-def log_inbound_message(phone: str, body: str, provider_ref: str):
-    if supabase is None:
-        return
+# phone -> (contact_id, project_id); repeat senders skip the contact lookup.
+# Only found contacts are cached, so a new contact is picked up on its next
+# message. The enrollment is not cached: it can change (completed,
+# re-enrolled, new campaign) and is read fresh for every message.
+_PHONE_CACHE: TTLCache = TTLCache(
+    maxsize=50_000, ttl=int(os.getenv("SMS_CONTACT_CACHE_TTL", "300"))
+)
+
 
-    project_id = None
-    enrollment_id = None
+async def _lookup_contact(phone: str) -> tuple[str | None, str | None]:
+    hit = _PHONE_CACHE.get(phone)
+    if hit is not None:
+        return hit
 
     # Lookup contact & project
-    contact_res = (
+    contact_res = await _execute(
         supabase.table("contact")
         .select("id, project_id")
         .eq("phone", phone)
         .order("created_at", desc=True)
         .limit(1)
-        .execute()
     )
+    if not contact_res.data:
+        return None, None
 
-    if contact_res.data:
-        contact = contact_res.data[0]
-        project_id = contact.get("project_id")
-
-        # Lookup latest enrollment
-        enr_res = (
-            supabase.table("enrollment")
-            .select("id")
-            .eq("contact_id", contact["id"])
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if enr_res.data:
-            enrollment_id = enr_res.data[0]["id"]
+    contact = contact_res.data[0]
+    hit = _PHONE_CACHE[phone] = (contact["id"], contact.get("project_id"))
+    return hit
+
+
+async def _lookup_project_enrollment(phone: str) -> tuple[str | None, str | None]:
+    contact_id, project_id = await _lookup_contact(phone)
+    if contact_id is None:
+        return project_id, None
+
+    # Lookup latest enrollment
+    enr_res = await _execute(
+        supabase.table("enrollment")
+        .select("id")
+        .eq("contact_id", contact_id)
+        .order("created_at", desc=True)
+        .limit(1)
+    )
+    enrollment_id = enr_res.data[0]["id"] if enr_res.data else None
+    return project_id, enrollment_id
+
+
+async def log_inbound_message(phone: str, body: str, provider_ref: str, now: str | None = None):
+    if supabase is None:
+        return
+
+    project_id, enrollment_id = await _lookup_project_enrollment(phone)
+    now = now or _now_iso()
 
     # Insert into message table (project_id MUST NOT be null)
-    supabase.table("message").insert({
+    await _execute(supabase.table("message").insert({
         "project_id": project_id,
         "enrollment_id": enrollment_id,
         "channel": "sms",
@@ -127,19 +172,29 @@ def log_inbound_message(phone: str, body: str, provider_ref: str):
         "content": {"text": body},
         "provider_ref": provider_ref,
         "status": "received",
-        "occurred_at": datetime.now(timezone.utc).isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }).execute()
+        "occurred_at": now,  # created_at: column default now()
+    }))
 
 
 # --------------------------------------------------------------------------
 # 🔐 Verify HMAC Signature
 # --------------------------------------------------------------------------
+# Keyed once at import; each verification copies the prepared ipad/opad state
+_HMAC_TEMPLATE = hmac.new(SMS_WEBHOOK_SECRET.encode(), b"", hashlib.sha256)
+# Exactly what hexdigest() emits; bytes.fromhex alone would also accept
+# uppercase and embedded whitespace
+_SIG_HEX = re.compile(r"[0-9a-f]{64}")
+
+
 def verify_hmac_signature(body_bytes: bytes, signature: str, timestamp: str, nonce: str) -> bool:
-    raw_body = body_bytes.decode()
-    message = f"{timestamp}.{nonce}.{raw_body}".encode()
-    mac = hmac.new(SMS_WEBHOOK_SECRET.encode(), message, hashlib.sha256)
-    return hmac.compare_digest(mac.hexdigest(), signature)
+    # Compare raw 32-byte digests (not 64-char hex); anything else is a mismatch
+    if not _SIG_HEX.fullmatch(signature):
+        return False
+    sig_bytes = bytes.fromhex(signature)
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(f"{timestamp}.{nonce}.".encode())
+    mac.update(body_bytes)
+    return hmac.compare_digest(mac.digest(), sig_bytes)
 
 
 # --------------------------------------------------------------------------
@@ -150,8 +205,11 @@ async def _classify_and_update_campaign_step(*, inbound_text: str, from_number:
         return None
 
     try:
-        agent = ConversationalResponseAgent()
-        classification = await agent.classify_message(inbound_text, channel="sms")
+        quick = _QUICK_INTENT.get(inbound_text.strip().lower().rstrip(".!"))
+        if quick is not None:
+            classification = {"intent": quick, "next_action": DEFAULT_NEXT_ACTION[quick]}
+        else:
+            classification = await get_conversational_agent().classify_message(inbound_text, channel="sms")
 
         intent = classification.get("intent")
         next_action = classification.get("next_action")
@@ -160,54 +218,13 @@ async def _classify_and_update_campaign_step(*, inbound_text: str, from_number:
         if not intent:
             return classification
 
-        # Lookup contact
-        contact_res = (
-            supabase.table("contact")
-            .select("id")
-            .eq("phone", from_number)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not contact_res.data:
-            return classification
-
-        contact_id = contact_res.data[0]["id"]
-
-        # Latest enrollment
-        enr_res = (
-            supabase.table("enrollment")
-            .select("registration_id")
-            .eq("contact_id", contact_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not enr_res.data:
-            return classification
-
-        registration_id = enr_res.data[0]["registration_id"]
-
-        # Latest step
-        step_res = (
-            supabase.table("lead_campaign_steps")
-            .select("id")
-            .eq("registration_id", registration_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not step_res.data:
-            return classification
-
-        step_id = step_res.data[0]["id"]
-
-        # Update step using only columns that exist
-        supabase.table("lead_campaign_steps").update({
-            "status": "completed",
-            "metadata": {"intent": intent, "next_action": next_action},
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", step_id).execute()
+        # contact -> latest enrollment -> latest step, marked completed in one
+        # round trip (see sql/migrations/0037)
+        await _execute(supabase.rpc("sms_classify_update", {
+            "p_phone": from_number,
+            "p_intent": intent,
+            "p_next": next_action,
+        }))
 
         return classification
 
@@ -219,16 +236,69 @@ async def _classify_and_update_campaign_step(*, inbound_text: str, from_number:
 # --------------------------------------------------------------------------
 # 📩 SMS Webhook Endpoint
 # --------------------------------------------------------------------------
+async def _record_inbound(phone: str | None, body: str, provider_ref: str, now: str | None = None) -> None:
+    """message row + contact.last_interaction_at, concurrently; failures are logged, not raised."""
+    now = now or _now_iso()  # one timestamp for the message row and the contact
+    results = await asyncio.gather(
+        log_inbound_message(phone, body, provider_ref, now),
+        update_last_interaction(phone, now),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, Exception):
+            logger.warning("Failed to record inbound SMS %s: %s", provider_ref, r)
+
+
+async def _signal_inbound(from_number: str | None, body: str) -> None:
+    try:
+        await signal_workflow(
+            signal_name="sms_inbound_signal",
+            payload={"from": from_number, "body": body},
+            workflow_id=DEFAULT_WORKFLOW_ID,
+        )
+    except Exception as e:
+        logger.warning("Failed to signal Temporal: %s", e)
+
+
+async def _process_inbound(app, payload: dict, provider_ref: str, from_number: str | None, inbound_text: str) -> None:
+    """Post-ACK pipeline: classify + signal Temporal concurrently, then hand off the event."""
+    classification, _ = await asyncio.gather(
+        _classify_and_update_campaign_step(inbound_text=inbound_text, from_number=from_number),
+        _signal_inbound(from_number, inbound_text),
+    )
+
+    # Provider pipeline
+    # Built from trusted values and a payload orjson already produced as plain
+    # JSON types: skip validation so the payload isn't walked/copied again
+    # before process_event_fn dumps it once for Temporal
+    event = WebhookEvent.model_construct(
+        event="sms_incoming",
+        channel="sms",
+        timestamp=datetime.now(timezone.utc),
+        payload=payload,
+        metadata={
+            "provider_ref": provider_ref,
+            "from": from_number,
+            "classification": classification,
+        },
+    )
+    try:
+        await app.state.process_event_fn("sms", event)
+    except Exception as e:
+        logger.warning("SMS event dispatch failed for %s: %s", provider_ref, e)
+
+
 @router.post("/webhooks/sms")
 async def sms_webhook(
     request: Request,
+    background_tasks: BackgroundTasks,
     x_signature: str = Header(None),
     x_timestamp: str = Header(None),
     x_nonce: str = Header(None),
     x_hub_signature_256: str = Header(None),
 ):
     body_bytes = await request.body()
-    print("SERVER RECEIVED BODY:", body_bytes.decode())
+    logger.debug("Received SMS webhook body (%d bytes)", len(body_bytes))
 
     # HMAC handling
     signature = x_signature or x_hub_signature_256
@@ -238,7 +308,11 @@ async def sms_webhook(
     if not verify_hmac_signature(body_bytes, signature, x_timestamp, x_nonce):
         raise HTTPException(401, "Invalid signature")
 
-    payload = await request.json()
+    # Parse the bytes already read for HMAC (no second body read / decode)
+    try:
+        payload = orjson.loads(body_bytes)
+    except orjson.JSONDecodeError:
+        raise HTTPException(400, "Malformed JSON payload")
 
     provider_ref = payload.get("messageId") or payload.get("message_id") or payload.get("sid")
     if not provider_ref:
@@ -249,63 +323,36 @@ async def sms_webhook(
 
     normalized_from = normalize_phone(from_number)
 
-    # Compliance
+    # Compliance (consent is written before the ACK; logging runs after it)
     compliance = compliance_keyword(inbound_text)
     if compliance == "stop":
-        set_sms_opt_in(normalized_from, False)
-        log_inbound_message(normalized_from, inbound_text, provider_ref)
-        update_last_interaction(normalized_from)
+        now = _now_iso()
+        await set_sms_opt_in(normalized_from, False, now)
+        background_tasks.add_task(_record_inbound, normalized_from, inbound_text, provider_ref, now)
         return {"status": "STOP applied"}
 
     if compliance == "start":
-        set_sms_opt_in(normalized_from, True)
-        log_inbound_message(normalized_from, inbound_text, provider_ref)
-        update_last_interaction(normalized_from)
+        now = _now_iso()
+        await set_sms_opt_in(normalized_from, True, now)
+        background_tasks.add_task(_record_inbound, normalized_from, inbound_text, provider_ref, now)
         return {"status": "START applied"}
 
     if compliance == "help":
-        log_inbound_message(normalized_from, inbound_text, provider_ref)
-        update_last_interaction(normalized_from)
+        background_tasks.add_task(_record_inbound, normalized_from, inbound_text, provider_ref)
         return {"status": "HELP acknowledged"}
 
-    # Log normal inbound
-    log_inbound_message(normalized_from, inbound_text, provider_ref)
-    update_last_interaction(normalized_from)
-
-    # Classification
-    classification = await _classify_and_update_campaign_step(
-        inbound_text=inbound_text,
-        from_number=normalized_from,
-    )
-
-    # Idempotency
+    # Idempotency before logging and classification. Compliance stays ahead of it
+    # so a failed consent write is re-applied when the provider retries.
     should_process = await request.app.state.idempotency.reserve(provider_ref)
     if not should_process:
         return {"status": "duplicate", "provider_ref": provider_ref}
 
-    # Signal Temporal
-    try:
-        await signal_workflow(
-            signal_name="sms_inbound_signal",
-            payload={"from": normalized_from, "body": inbound_text},
-            workflow_id=DEFAULT_WORKFLOW_ID,
-        )
-    except Exception as e:
-        logger.warning("Failed to signal Temporal: %s", e)
+    # Log normal inbound (after the ACK; nothing below depends on it)
+    background_tasks.add_task(_record_inbound, normalized_from, inbound_text, provider_ref)
 
-    # Provider pipeline
-    event = WebhookEvent(
-        event="sms_incoming",
-        channel="sms",
-        timestamp=datetime.now(timezone.utc),
-        payload=payload,
-        metadata={
-            "provider_ref": provider_ref,
-            "from": normalized_from,
-            "classification": classification,
-        },
+    # Classification, Temporal signal and provider pipeline run after the ACK
+    background_tasks.add_task(
+        _process_inbound, request.app, payload, provider_ref, normalized_from, inbound_text
     )
 
-    await request.app.state.process_event_fn("sms", event)
-
     return {"status": "received", "provider_ref": provider_ref}
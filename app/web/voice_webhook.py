@@ -1,18 +1,20 @@
 # app/web/voice_webhook.py
 
-from fastapi import APIRouter, Request
-from supabase import create_client
+from fastapi import APIRouter, HTTPException, Request
+import asyncio
 import os
 import datetime
-import json
 import logging
+import orjson
 from postgrest.exceptions import APIError
 
+from app.utils.supabase_client import create_pooled_client
+
 router = APIRouter()
 log = logging.getLogger("cory.voice.webhook")
 
 # Initialize Supabase client
-supabase = create_client(
+supabase = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
 )
@@ -42,8 +44,21 @@ async def receive_transcript(request: Request):
       "metadata": { ... }
     }
     """
-    data = await request.json()
-    log.info("[Webhook] Received payload from Synthflow: %s", json.dumps(data)[:500])
+    body_bytes = await request.body()
+    try:
+        data = orjson.loads(body_bytes)
+    except orjson.JSONDecodeError:
+        raise HTTPException(400, "Malformed JSON payload")
+    # Bounded logging: top-level keys + call id; the raw body only at DEBUG
+    if log.isEnabledFor(logging.INFO):
+        log.info(
+            "[Webhook] Received Synthflow payload keys=%s call_id=%s (%d bytes)",
+            list(data)[:8],
+            (data.get("call") or {}).get("call_id"),
+            len(body_bytes),
+        )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("[Webhook] Synthflow payload head: %s", body_bytes[:500].decode(errors="replace"))
 
     # ✅ Unwrap Synthflow JSON structure
     call = data.get("call", {}) or {}
@@ -100,12 +115,12 @@ async def receive_transcript(request: Request):
         "content": content,
         "transcript": transcript,   # 🔥 populate column
         "audio_url": audio_url,     # 🔥 populate column
-        "occurred_at": now,
-        "created_at": now,
+        "occurred_at": now,  # created_at: column default now()
     }
 
     try:
-        supabase.table("message").insert(record).execute()
+        # One insert per callback; supabase-py is blocking, so keep it off the loop
+        await asyncio.to_thread(supabase.table("message").insert(record).execute)
         log.info(
             "✅ Stored voice transcript for call_id=%s (phone=%s, lead=%s, status=%s)",
             provider_ref,
@@ -1,11 +1,10 @@
 # app/web/webhook.py
 from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
 from typing import Optional
-from datetime import datetime
 import logging
 
-from app.web.schemas import normalize_webhook_event
-from app.web.security import verify_request_signature
+from app.web.schemas import normalize_webhook_event_json
+from app.web.security import verify_request_signature_async
 from app.repo.supabase_repo import SupabaseRepo
 from app.orchestrator.temporal.signal_bridge import send_temporal_signal
 from app.web import metrics as metrics_mod
@@ -15,6 +14,12 @@ logger = logging.getLogger("cory.webhook")
 repo = SupabaseRepo()
 
 
+@router.on_event("shutdown")
+async def _close_repo() -> None:
+    """Release the repo's pooled HTTP connections."""
+    await repo.aclose()
+
+
 # Background refresh task
 async def _refresh_snapshot_bg() -> None:
     """Kick off a non-blocking refresh of enrollment_state_snapshot."""
@@ -27,12 +32,6 @@ async def _refresh_snapshot_bg() -> None:
         )
 
 
-@router.get("/healthz")
-async def healthz(request: Request):
-    """Simple health check endpoint."""
-    return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
-
-
 @router.post("/webhooks/campaign/{campaign_id}")
 async def campaign_webhook(
     campaign_id: str,
@@ -44,7 +43,7 @@ async def campaign_webhook(
 
     Responsibilities:
     - Verify HMAC-style signature headers
-    - Normalize payload into an internal WebhookEvent via normalize_webhook_event
+    - Normalize payload into an internal WebhookEvent via normalize_webhook_event_json
     - Enforce idempotency using app.state.processed_refs
     - Trigger a background refresh of enrollment_state_snapshot
 
@@ -61,12 +60,11 @@ async def campaign_webhook(
         raise HTTPException(status_code=401, detail="missing security headers")
 
     body_bytes = await request.body()
-    verify_request_signature(x_timestamp, x_nonce, x_signature, body_bytes)
+    await verify_request_signature_async(x_timestamp, x_nonce, x_signature, body_bytes)
 
-    # ✅ Parse and normalize
-    body = await request.json()
+    # ✅ Parse and normalize (from the bytes already read for the signature)
     try:
-        event = normalize_webhook_event(body)
+        event = normalize_webhook_event_json(body_bytes)
     except Exception as e:
         logger.warning("invalid webhook payload", extra={"error": str(e)})
         raise HTTPException(status_code=422, detail="invalid payload")
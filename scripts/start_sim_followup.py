@@ -3,6 +3,8 @@ from temporalio.client import Client
 import asyncio
 from datetime import datetime
 
+from app.orchestrator.temporal.config import SIMULATED_QUEUE
+
 async def main():
     client = await Client.connect("localhost:7233")
 
@@ -19,7 +21,7 @@ async def main():
         "SimulatedFollowupWorkflow",  # name of your workflow class
         lead,
         id=workflow_id,
-        task_queue="followup-q",
+        task_queue=SIMULATED_QUEUE,
     )
     print(f"✅ Started workflow: {workflow_id}")
 
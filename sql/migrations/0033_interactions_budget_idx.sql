@@ -0,0 +1,9 @@
+-- =============================================================================
+-- Cory Admissions - interactions index for pre-send budget / rate caps
+-- Backs the single-query check in app/policy/guards_budget.py:
+--   SUM(cost_usd) per campaign + COUNT(*) per campaign/channel in the last hour.
+-- Safe to run multiple times.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_interactions_campaign_channel_created
+  ON public.interactions (campaign_id, channel, created_at DESC);
@@ -0,0 +1,32 @@
+-- =============================================================================
+-- Cory Admissions - enrollment status RPC (B1.3 repo fast path)
+-- One round trip for SupabaseRepo.get_enrollment_status: the enrollment's
+-- status plus EXISTS probes for outcome / handoff rows.
+-- Safe to run multiple times.
+-- =============================================================================
+
+begin;
+
+drop function if exists dev_nexus.enrollment_status(uuid);
+create or replace function dev_nexus.enrollment_status(eid uuid)
+returns table (
+  status text,
+  has_outcome boolean,
+  has_handoff boolean
+)
+language sql
+stable
+set search_path = dev_nexus, public, pg_catalog
+as $$
+  select
+    e.status,
+    exists (select 1 from dev_nexus.outcome o where o.enrollment_id = eid),
+    exists (select 1 from dev_nexus.handoff h where h.enrollment_id = eid)
+  from dev_nexus.enrollment e
+  where e.id = eid
+$$;
+
+revoke all on function dev_nexus.enrollment_status(uuid) from public, anon, authenticated;
+grant execute on function dev_nexus.enrollment_status(uuid) to service_role;
+
+commit;
@@ -0,0 +1,52 @@
+-- =============================================================================
+-- Cory Admissions - email intent RPC (inbound email webhook fast path)
+-- Resolves contact.email -> latest enrollment -> latest lead_campaign_steps
+-- row and stamps intent / next_action on it in one statement, so the webhook
+-- makes one round trip and no row can change between the SELECT and UPDATE.
+-- Returns the updated step id, or NULL when nothing matched.
+-- Safe to run multiple times.
+-- =============================================================================
+
+begin;
+
+drop function if exists public.update_latest_step_by_email(text, text, text);
+create or replace function public.update_latest_step_by_email(
+  email text,
+  intent text,
+  next_action text
+)
+returns uuid
+language sql
+volatile
+set search_path = public, pg_catalog
+as $$
+  update public.lead_campaign_steps s
+     set intent = update_latest_step_by_email.intent,
+         next_action = update_latest_step_by_email.next_action,
+         updated_at = now()
+   where s.id = (
+     select lcs.id
+       from public.lead_campaign_steps lcs
+      where lcs.registration_id = (
+        select e.registration_id
+          from public.enrollment e
+         where e.contact_id = (
+           select c.id
+             from public.contact c
+            where c.email = update_latest_step_by_email.email
+            order by c.created_at desc
+            limit 1
+         )
+         order by e.created_at desc
+         limit 1
+      )
+      order by lcs.created_at desc
+      limit 1
+   )
+  returning s.id
+$$;
+
+revoke all on function public.update_latest_step_by_email(text, text, text) from public, anon, authenticated;
+grant execute on function public.update_latest_step_by_email(text, text, text) to service_role;
+
+commit;
@@ -0,0 +1,72 @@
+-- =============================================================================
+-- Cory Admissions - handoff_create via INSERT ... ON CONFLICT
+-- Replaces the existing-CTE + INSERT ... WHERE NOT EXISTS + UNION ALL form
+-- (0032_handoff_rpc.sql) with a single insert arbitrated by the partial
+-- unique index uq_open_handoff_identity (0031_handoff.sql): one index probe,
+-- and concurrent creates for the same identity can no longer both insert.
+-- On conflict nothing is written and the existing open/in_progress row is
+-- returned unchanged (updated_at included) by a follow-up SELECT.
+-- Safe to run multiple times.
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION public.handoff_create(
+  p_organization_id uuid,
+  p_title text,
+  p_task_type text,
+  p_source text DEFAULT 'system',
+  p_source_key text DEFAULT NULL,
+  p_lead_id uuid DEFAULT NULL,
+  p_interaction_id uuid DEFAULT NULL,
+  p_description text DEFAULT NULL,
+  p_priority handoff_priority DEFAULT 'normal',
+  p_assigned_to uuid DEFAULT NULL,
+  p_metadata jsonb DEFAULT '{}'::jsonb,
+  p_explicit_sla_due_at timestamptz DEFAULT NULL
+)
+RETURNS SETOF handoffs
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_minutes int := COALESCE((
+    CASE p_task_type
+      WHEN 'escalation'    THEN 60
+      WHEN 'callback'      THEN 1440
+      WHEN 'manual_email'  THEN 720
+      WHEN 'review_outcome'THEN 240
+      ELSE 1440
+    END
+  ), 1440);
+  v_sla_due timestamptz := COALESCE(p_explicit_sla_due_at, now() + make_interval(mins => v_minutes));
+BEGIN
+  RETURN QUERY
+  INSERT INTO handoffs AS h (
+    organization_id, lead_id, interaction_id, task_type, source, source_key,
+    title, description, priority, status, assigned_to, sla_due_at, metadata
+  )
+  VALUES (p_organization_id, p_lead_id, p_interaction_id, p_task_type, p_source, p_source_key,
+          p_title, p_description, p_priority, 'open', p_assigned_to, v_sla_due, COALESCE(p_metadata,'{}'::jsonb))
+  ON CONFLICT (
+    organization_id,
+    task_type,
+    COALESCE(lead_id, '00000000-0000-0000-0000-000000000000'::uuid),
+    source,
+    COALESCE(source_key, '')
+  ) WHERE status IN ('open','in_progress')
+  DO NOTHING
+  RETURNING h.*;
+
+  IF NOT FOUND THEN
+    RETURN QUERY
+    SELECT * FROM handoffs
+    WHERE organization_id = p_organization_id
+      AND task_type = p_task_type
+      AND COALESCE(lead_id, '00000000-0000-0000-0000-000000000000'::uuid)
+          = COALESCE(p_lead_id, '00000000-0000-0000-0000-000000000000'::uuid)
+      AND source = p_source
+      AND COALESCE(source_key, '') = COALESCE(p_source_key, '')
+      AND status IN ('open','in_progress')
+    ORDER BY created_at ASC
+    LIMIT 1;
+  END IF;
+END;
+$$;
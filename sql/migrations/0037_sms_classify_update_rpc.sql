@@ -0,0 +1,53 @@
+-- =============================================================================
+-- Cory Admissions - SMS intent RPC (inbound SMS webhook fast path)
+-- Resolves contact.phone -> latest enrollment -> latest lead_campaign_steps
+-- row and marks it completed with the classified intent / next_action in one
+-- statement (one round trip instead of three SELECTs + an UPDATE).
+-- Returns the updated step id, or NULL when nothing matched.
+-- Safe to run multiple times.
+-- =============================================================================
+
+begin;
+
+drop function if exists public.sms_classify_update(text, text, text);
+create or replace function public.sms_classify_update(
+  p_phone text,
+  p_intent text,
+  p_next text
+)
+returns uuid
+language sql
+volatile
+set search_path = public, pg_catalog
+as $$
+  with c as (
+    select id
+      from public.contact
+     where phone = p_phone
+     order by created_at desc
+     limit 1
+  ), e as (
+    select registration_id
+      from public.enrollment
+     where contact_id = (select id from c)
+     order by created_at desc
+     limit 1
+  ), s as (
+    select id
+      from public.lead_campaign_steps
+     where registration_id = (select registration_id from e)
+     order by created_at desc
+     limit 1
+  )
+  update public.lead_campaign_steps
+     set status = 'completed',
+         metadata = jsonb_build_object('intent', p_intent, 'next_action', p_next),
+         completed_at = now()
+   where id = (select id from s)
+  returning id
+$$;
+
+revoke all on function public.sms_classify_update(text, text, text) from public, anon, authenticated;
+grant execute on function public.sms_classify_update(text, text, text) to service_role;
+
+commit;
@@ -0,0 +1,27 @@
+-- =============================================================================
+-- Cory Admissions - indexes for the "latest row" lookups on inbound webhooks
+-- SMS / email handlers (and the 0035 / 0037 RPCs) resolve
+--   contact (by phone or email) -> latest enrollment -> latest lead_campaign_steps
+-- with `where <key> = $1 order by created_at desc limit 1`. Each index matches
+-- the predicate + sort (one index probe, no sort) and INCLUDEs the selected
+-- columns so the lookups can be answered index-only.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block: run this
+-- file without begin/commit (psql autocommit). Safe to run multiple times.
+-- =============================================================================
+
+create index concurrently if not exists idx_contact_phone_created
+  on public.contact (phone, created_at desc)
+  include (id, project_id);
+
+create index concurrently if not exists idx_contact_email_created
+  on public.contact (email, created_at desc)
+  include (id);
+
+create index concurrently if not exists idx_enrollment_contact_created
+  on public.enrollment (contact_id, created_at desc)
+  include (id, registration_id);
+
+create index concurrently if not exists idx_lcs_reg_created
+  on public.lead_campaign_steps (registration_id, created_at desc)
+  include (id);
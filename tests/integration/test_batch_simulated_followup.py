@@ -0,0 +1,53 @@
+# tests/integration/test_batch_simulated_followup.py
+import asyncio
+import pytest
+from temporalio import activity
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker, UnsandboxedWorkflowRunner
+
+from app.orchestrator.temporal.config import LLM_QUEUE
+from app.orchestrator.temporal.workflows import simulated_followup
+from app.orchestrator.temporal.workflows.simulated_followup import BatchSimulatedFollowupWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+FOLLOWUP_QUEUE = "test-batch-followup"
+
+
+@activity.defn(name="generate_followup_message")
+async def fake_generate_followup_message(lead: dict) -> str:
+    return f"hi {lead['name']}"
+
+
+@activity.defn(name="finalize_followup")
+async def fake_finalize_followup(data) -> None:
+    if data["enrollment_id"] == "L2":
+        raise RuntimeError("supabase down")
+
+
+async def test_batch_reports_failed_leads_across_continue_as_new(monkeypatch):
+    # Two leads per run so the third one is handled after continue-as-new
+    # (unsandboxed runner so the patched module constant is what the workflow sees)
+    monkeypatch.setattr(simulated_followup, "BATCH_MAX", 2)
+    leads = [{"id": f"L{i}", "name": f"Lead {i}"} for i in (1, 2, 3)]
+
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        client = env.client
+        async with Worker(
+            client,
+            task_queue=FOLLOWUP_QUEUE,
+            workflows=[BatchSimulatedFollowupWorkflow],
+            activities=[fake_finalize_followup],
+            workflow_runner=UnsandboxedWorkflowRunner(),
+        ), Worker(client, task_queue=LLM_QUEUE, activities=[fake_generate_followup_message]):
+            result = await asyncio.wait_for(
+                client.execute_workflow(
+                    BatchSimulatedFollowupWorkflow.run,
+                    leads,
+                    id="wf-batch-followup-1",
+                    task_queue=FOLLOWUP_QUEUE,
+                ),
+                timeout=30,
+            )
+
+    assert result == {"status": "completed_with_failures", "failed_lead_ids": ["L2"]}
@@ -4,9 +4,7 @@ from app.policy.guards_budget import evaluate_budget_caps
 @pytest.mark.asyncio
 async def test_budget_cap_blocks():
     async def fake_query(self, q, *args):
-        if "SUM" in q:
-            return [{"spent": 150.0}]
-        return [{"cnt": 10}]
+        return [{"spent": 150.0, "cnt": 10}]
 
     class FakeDB:
         async def execute_query(self, q, *args):
@@ -21,9 +19,7 @@ async def test_budget_cap_blocks():
 @pytest.mark.asyncio
 async def test_rate_cap_blocks(monkeypatch):
     async def fake_query(self, q, *args):
-        if "SUM" in q:
-            return [{"spent": 50.0}]  # under budget
-        return [{"cnt": 999}]  # over rate cap
+        return [{"spent": 50.0, "cnt": 999}]  # under budget, over rate cap
 
     class FakeDB:
         async def execute_query(self, q, *args):
@@ -39,9 +35,7 @@ async def test_rate_cap_blocks(monkeypatch):
 @pytest.mark.asyncio
 async def test_caps_pass_under_limits(monkeypatch):
     async def fake_query(q, *args):
-        if "SUM" in q:
-            return [{"spent": 50.0}]
-        return [{"cnt": 10}]
+        return [{"spent": 50.0, "cnt": 10}]
     async_db = type("FakeDB", (), {"execute_query": fake_query})()
     policy = {"budget_usd_limit": 200.0, "rate_limit_per_hour": 100}
     allowed, reason, hint = await evaluate_budget_caps(async_db, "CAMP123", "sms", policy)
@@ -0,0 +1,89 @@
+import json
+
+import httpx
+import pytest
+
+import app.data.supabase_repo as repo
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "svc")
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else None
+        calls.append((request.method, request.url.path, body))
+        if request.method == "POST":
+            return httpx.Response(201, json=body)
+        return httpx.Response(200, json=[{"id": "enr1"}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        repo.httpx, "AsyncClient",
+        lambda *a, **k: real_client(transport=httpx.MockTransport(handler)),
+    )
+    return calls
+
+
+async def test_finalize_followup_one_bulk_insert_and_one_patch(captured):
+    out = await repo.finalize_followup(
+        repo.FollowupFinalizeInput(
+            enrollment_id="enr1",
+            channel="SMS",
+            outbound_message="hi",
+            inbound_message="thanks",
+            now_iso="2025-01-01T10:00:00+00:00",
+        )
+    )
+    assert [c[:2] for c in captured] == [
+        ("POST", "/rest/v1/interactions"),
+        ("PATCH", "/rest/v1/campaign_enrollments"),
+    ]
+    rows = captured[0][2]
+    assert [r["direction"] for r in rows] == ["outbound", "inbound"]
+    assert rows[0]["channel"] == "sms"
+    assert captured[1][2]["last_contacted_at"] == "2025-01-01 10:00:00+00:00"
+    assert out["interactions"] == 2
+
+
+async def test_finalize_followup_without_reply_inserts_outbound_only(captured):
+    await repo.finalize_followup(
+        repo.FollowupFinalizeInput("enr1", "email", "hello", None, "2025-01-01T10:00:00Z")
+    )
+    rows = captured[0][2]
+    assert len(rows) == 1 and rows[0]["message_type"] == "ai_generated"
+
+
+async def test_finalize_followup_retry_reuses_interaction_ids(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "svc")
+    posts, patches = [], []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            posts.append(request)
+            return httpx.Response(201, json=json.loads(request.content))
+        patches.append(request)
+        # First PATCH fails after the INSERT went through
+        return httpx.Response(400 if len(patches) == 1 else 200, json=[{"id": "enr1"}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        repo.httpx, "AsyncClient",
+        lambda *a, **k: real_client(transport=httpx.MockTransport(handler)),
+    )
+
+    data = repo.FollowupFinalizeInput("enr1", "sms", "hi", "thanks", "2025-01-01T10:00:00Z", workflow_id="wf-1")
+    with pytest.raises(httpx.HTTPStatusError):
+        await repo.finalize_followup(data)
+    await repo.finalize_followup(data)
+
+    first, retry = (json.loads(p.content) for p in posts)
+    assert [r["id"] for r in first] == [r["id"] for r in retry]
+    assert len({r["id"] for r in first}) == 2
+    assert posts[1].url.params["on_conflict"] == "id"
+    assert "resolution=ignore-duplicates" in posts[1].headers["Prefer"]
@@ -90,6 +90,28 @@ async def test_create_idempotent_on_open():
     assert first["status"] in ("open", "in_progress")
     assert first["sla_due_at"] is not None
 
+async def test_repo_create_twice_returns_same_open_handoff(asyncpg_pool):
+    """HandoffRepo.create: the conflicting insert writes nothing and returns the open row."""
+    import json
+    from uuid import UUID
+    from app.repo.handoff_repo import HandoffRepo
+
+    org_id, lead_id = UUID(_uuid()), UUID(_uuid())
+    async with asyncpg_pool.acquire() as conn:
+        await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        repo = HandoffRepo(conn)
+        kwargs = dict(organization_id=org_id, title="Escalate to advisor", task_type="escalation",
+                      source_key=f"lead:{lead_id}", lead_id=lead_id)
+
+        first = await repo.create(**kwargs)
+        before = await conn.fetchval("SELECT updated_at FROM handoffs WHERE id=$1", first["id"])
+        second = await repo.create(**kwargs)
+        after = await conn.fetchval("SELECT updated_at FROM handoffs WHERE id=$1", first["id"])
+
+    assert second["id"] == first["id"]
+    assert second["status"] == "open"
+    assert after == before  # duplicate create leaves the open row untouched
+
 async def test_mark_first_response_sets_timestamp_and_status():
     org_id, user_id = await _seed_org_user()
 
@@ -0,0 +1,39 @@
+from app.policy.matching_dsl import compile_ruleset, evaluate_batch, evaluate_ruleset
+
+RULES = [
+    {"dsl": {"if": {"interest_contains": "Nurs", "min_gpa": 3.0}, "then": {"program_code": "RN", "score": 0.9}}},
+    {"dsl": {"if": {"zip_in": ["100*"]}, "then": {"program_code": "NYC", "score": 0.7}}},
+    {"dsl": {"if": {"interest_contains": "nurs"}, "then": {"program_code": "RN", "score": 0.5}}},
+    {"dsl": {"if": {"min_gpa": 3.8}, "then": {"program_code": "HON"}}},
+]
+
+
+def test_evaluate_ruleset_first_match_wins_and_reports_gaps():
+    scores, gaps = evaluate_ruleset({"interest": "Nursing", "zip": "10021", "gpa": "3.2"}, RULES)
+    assert scores == [
+        {"program_code": "RN", "score": 0.9, "source": "rules"},
+        {"program_code": "NYC", "score": 0.7, "source": "rules"},
+    ]
+    assert gaps == ["HON", "RN"]
+
+
+def test_evaluate_batch_matches_single_lead_evaluation():
+    leads = [
+        {"interest": "nursing", "zip": "90210", "gpa": 2.5},
+        {"interest": None, "zip": "10001", "gpa": 3.9},
+        {},
+    ]
+    cr = compile_ruleset(RULES)
+    assert evaluate_batch(leads, cr) == [evaluate_ruleset(lead, RULES) for lead in leads]
+
+
+def test_empty_ruleset():
+    assert evaluate_batch([{"interest": "x"}], compile_ruleset([])) == [([], [])]
+
+
+def test_compile_ruleset_cached_reuses_until_rules_change():
+    from app.policy.matching_dsl import compile_ruleset_cached
+
+    first = compile_ruleset_cached("v-test", [dict(r) for r in RULES])
+    assert compile_ruleset_cached("v-test", [dict(r) for r in RULES]) is first
+    assert compile_ruleset_cached("v-test", RULES[:1]) is not first
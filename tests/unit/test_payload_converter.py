@@ -0,0 +1,36 @@
+import json
+
+from temporalio.converter import DataConverter
+
+from app.orchestrator.temporal.common.converter import data_converter
+from app.orchestrator.temporal.workflows.handoff import HandoffInput, HandoffResult
+
+
+def _inp() -> HandoffInput:
+    return HandoffInput(
+        workflow_run_id="run-1",
+        subject="Manual review needed",
+        channel="slack",
+        payload={"applicant_id": "A-123", "nested": {"b": 2, "a": 1}},
+        timeout_seconds=20,
+    )
+
+def test_wire_compatible_with_default_converter():
+    value = _inp()
+    ours = data_converter.payload_converter.to_payloads([value])[0]
+    stock = DataConverter.default.payload_converter.to_payloads([value])[0]
+    assert ours.metadata["encoding"] == b"json/plain"
+    assert json.loads(ours.data) == json.loads(stock.data)
+
+def test_roundtrip_dataclass_type_hints():
+    pc = data_converter.payload_converter
+    res = HandoffResult(handoff_id="h1", outcome="resolved", resolution_payload={"by": "x"})
+    payloads = pc.to_payloads([_inp(), res])
+    inp_out, res_out = pc.from_payloads(payloads, [HandoffInput, HandoffResult])
+    assert inp_out == _inp()
+    assert res_out == res
+
+def test_non_dataclass_values_pass_through():
+    pc = data_converter.payload_converter
+    payloads = pc.to_payloads([None, b"raw", {"k": [1, 2]}])
+    assert pc.from_payloads(payloads) == [None, b"raw", {"k": [1, 2]}]
@@ -86,3 +86,132 @@ async def test_evaluate_policy_guards_blocks():
     assert reason == "freq_cap"
 
 
+@pytest.mark.asyncio
+async def test_evaluate_policy_guards_prefers_hot_counter(monkeypatch):
+    """Redis counter hit should skip the DB COUNT(*) entirely."""
+    from app.policy import counters
+
+    async def fake_counter(lead_id, ch): return 5
+    monkeypatch.setattr(counters, "get_sent_24h", fake_counter)
+
+    class FailingDB:
+        async def execute_query(self, *a):
+            raise AssertionError("DB should not be queried")
+
+    lead = {"id": "L1", "metadata": {"communication_consent": {"accepted_terms": True}}}
+    org = {"policy": {"frequency_cap_per_24h": 3}}
+
+    allowed, reason = await evaluate_policy_guards(FailingDB(), lead, org, "sms")
+    assert not allowed
+    assert reason == "freq_cap"
+
+
+class _FakeCounterRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def mget(self, keys):
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipe:
+            async def __aenter__(self): return self
+            async def __aexit__(self, *exc): return False
+            def incr(self, key): redis.store[key] = str(int(redis.store.get(key) or 0) + 1)
+            def expire(self, key, ttl): pass
+            def set(self, key, value, nx=False):
+                if not (nx and key in redis.store):
+                    redis.store[key] = str(value)
+            async def execute(self): return []
+
+        return Pipe()
+
+
+@pytest.mark.asyncio
+async def test_send_counter_is_unknown_until_window_is_warm(monkeypatch):
+    """Missing or young 'since' marker → None, so the guard falls back to the DB count."""
+    from app.policy import counters
+
+    redis = _FakeCounterRedis()
+    monkeypatch.setattr(counters, "_get_redis", lambda: redis)
+    t0 = 1_700_000_000.0
+
+    # Fresh/flushed Redis: no buckets and no marker is "unknown", not zero
+    assert await counters.get_sent_24h("L1", "sms", now=t0) is None
+
+    await counters.incr_sent("L1", "sms", now=t0)
+    await counters.incr_sent("L1", "sms", now=t0 + 3600)
+    assert await counters.get_sent_24h("L1", "sms", now=t0 + 7200) is None
+
+    assert await counters.get_sent_24h("L1", "sms", now=t0 + 86400) == 1  # t0 bucket aged out
+    assert await counters.get_sent_24h("L1", "email", now=t0 + 86400) is None
+
+
+@pytest.mark.asyncio
+async def test_evaluate_policy_guards_cold_counter_uses_db(monkeypatch):
+    """A cold Redis window must not bypass the cap: the DB count is used."""
+    from app.policy import counters
+
+    monkeypatch.setattr(counters, "_get_redis", lambda: _FakeCounterRedis())
+
+    class FakeDB:
+        async def execute_query(self, q, lead_id, ch):
+            return [{"cnt": 4}]
+
+    lead = {"id": "L1", "metadata": {"communication_consent": {"accepted_terms": True}}}
+    org = {"policy": {"frequency_cap_per_24h": 3}}
+
+    allowed, reason = await evaluate_policy_guards(FakeDB(), lead, org, "sms")
+    assert not allowed
+    assert reason == "freq_cap"
+
+
+def test_check_quiet_hours_same_day_and_wrapping_windows():
+    """Cached minute window handles same-day and midnight-crossing ranges."""
+    from datetime import time
+    from app.policy.guards import check_quiet_hours
+
+    with pytest.raises(PolicyDenied):
+        check_quiet_hours(datetime(2025, 5, 10, 13, 0), start=time(12, 0), end=time(14, 0))
+    check_quiet_hours(datetime(2025, 5, 10, 14, 1), start=time(12, 0), end=time(14, 0))
+    with pytest.raises(PolicyDenied):
+        check_quiet_hours(datetime(2025, 5, 10, 23, 59))
+    with pytest.raises(PolicyDenied):
+        check_quiet_hours(datetime(2025, 5, 10, 8, 0))
+    check_quiet_hours(datetime(2025, 5, 10, 8, 1))
+
+
+def test_check_quiet_hours_bounds_are_inclusive_to_the_instant():
+    """end and start == end keep the baseline time() comparison, not whole minutes."""
+    from datetime import time
+    from app.policy.guards import check_quiet_hours, pre_send_decision
+
+    with pytest.raises(PolicyDenied):
+        check_quiet_hours(datetime(2025, 5, 10, 17, 0), start=time(9, 0), end=time(17, 0))
+    check_quiet_hours(datetime(2025, 5, 10, 17, 0, 30), start=time(9, 0), end=time(17, 0))
+
+    with pytest.raises(PolicyDenied):
+        check_quiet_hours(datetime(2025, 5, 10, 12, 0), start=time(12, 0), end=time(12, 0))
+    check_quiet_hours(datetime(2025, 5, 10, 12, 0, 30), start=time(12, 0), end=time(12, 0))
+
+    verdict = pre_send_decision(
+        enrollment={"consent": True},
+        step={},
+        policy={"quiet_hours": True, "quiet_start": "21:00", "quiet_end": "08:00"},
+        context={"now": "2025-05-10T23:30:00", "sent_count_last_24h": 0},
+    )
+    assert verdict["next_hint"] == {"schedule_after": "2025-05-11T08:01:00"}
+
+
+def test_compile_policy_reuses_compiled_struct_for_equal_policies():
+    """Fresh-but-equal policy dicts share one CompiledPolicy."""
+    from app.policy.guards import compile_policy
+
+    a = compile_policy({"quiet_start": "22:00", "dnc_labels": ["dnc"]})
+    b = compile_policy({"quiet_start": "22:00", "dnc_labels": ["dnc"]})
+    assert a is b
+    assert a.dnc_labels == frozenset({"dnc"})
+    assert (a.quiet_start_min, a.quiet_span_min) == (22 * 60, 10 * 60)
+    assert compile_policy({"frequency_cap_per_24h": [1]}).frequency_cap == [1]  # unhashable → uncached
@@ -1,12 +1,31 @@
-import os
 import json
-from unittest.mock import MagicMock
+import httpx
 import pytest
 
 from app.repo.supabase_repo import SupabaseRepo, SupabaseRepoConfig
 from app.repo.dtos import MessageDTO, EventDTO, LinkRefDTO
 
-def repo_with_mock(session_mock) -> SupabaseRepo:
+pytestmark = pytest.mark.asyncio
+
+
+class FakePostgrest:
+    """Replays canned (status, body) responses and records each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        status, body = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return httpx.Response(status, content=json.dumps(body).encode())
+
+    @property
+    def last(self) -> httpx.Request:
+        return self.requests[-1]
+
+
+def repo_with_mock(fake) -> SupabaseRepo:
     cfg = SupabaseRepoConfig(
         base_url="https://example.supabase.co",
         service_key="svc",
@@ -14,83 +33,178 @@ def repo_with_mock(session_mock) -> SupabaseRepo:
         max_attempts=3,
         base_backoff_seconds=0.001,
     )
-    r = SupabaseRepo(cfg)
-    r._session = session_mock
-    return r
-
-class Resp:
-    def __init__(self, status, body=None):
-        self.status_code = status
-        self._body = body
-        self.text = json.dumps(body) if body is not None else ""
-    def json(self):
-        return self._body
-
-def test_log_outbound_idempotent_upsert():
-    s = MagicMock()
+    client = httpx.AsyncClient(base_url=cfg.base_url, transport=httpx.MockTransport(fake))
+    return SupabaseRepo(cfg, client=client)
+
+async def test_log_outbound_idempotent_upsert():
     # First call 201 (created), second call 200 (merged) with same body
-    s.post.side_effect = [
-        Resp(201, [{"id": "m1", "provider_ref": "r1", "direction": "outbound"}]),
-        Resp(200, [{"id": "m1", "provider_ref": "r1", "direction": "outbound"}]),
-    ]
-    repo = repo_with_mock(s)
+    fake = FakePostgrest(
+        (201, [{"id": "m1", "provider_ref": "r1", "direction": "outbound"}]),
+        (200, [{"id": "m1", "provider_ref": "r1", "direction": "outbound"}]),
+    )
+    repo = repo_with_mock(fake)
 
     dto = MessageDTO(provider_ref="r1", direction="outbound", payload={"a": 1})
-    first = repo.log_outbound(dto)
-    second = repo.log_outbound(dto)
+    first = await repo.log_outbound(dto)
+    second = await repo.log_outbound(dto)
 
     assert first["id"] == second["id"]
     # Ensure on_conflict was used
-    args, kwargs = s.post.call_args
-    assert kwargs["params"]["on_conflict"] == "provider_ref,direction"
+    assert fake.last.url.params["on_conflict"] == "provider_ref,direction"
+    assert "resolution=merge-duplicates" in fake.last.headers["Prefer"]
 
-def test_log_inbound_idempotent_upsert():
-    s = MagicMock()
-    s.post.return_value = Resp(200, [{"id": "e1", "provider_ref": "r2", "direction": "inbound"}])
-    repo = repo_with_mock(s)
+async def test_log_inbound_idempotent_upsert():
+    fake = FakePostgrest((200, [{"id": "e1", "provider_ref": "r2", "direction": "inbound"}]))
+    repo = repo_with_mock(fake)
 
     dto = EventDTO(provider_ref="r2", direction="inbound", type="delivered")
-    out = repo.log_inbound(dto)
+    out = await repo.log_inbound(dto)
 
     assert out["id"] == "e1"
-    args, kwargs = s.post.call_args
-    assert kwargs["params"]["on_conflict"] == "provider_ref,direction"
-
-def test_get_enrollment_status_deterministic():
-    s = MagicMock()
-    # enrollment -> active
-    s.request.side_effect = [
-        Resp(200, [{"id": "enr1", "status": "active"}]),  # enrollment
-        Resp(200, []),                                    # outcome none
-        Resp(200, [{"id": "h1"}]),                        # handoff exists
-    ]
-    repo = repo_with_mock(s)
-    status = repo.get_enrollment_status("enr1")
+    assert fake.last.url.params["on_conflict"] == "provider_ref,direction"
+
+async def test_get_enrollment_status_single_rpc():
+    fake = FakePostgrest((200, [{"status": "active", "has_outcome": True, "has_handoff": True}]))
+    repo = repo_with_mock(fake)
+    status = await repo.get_enrollment_status("enr1")
+    assert status.computed == "completed"
+    assert len(fake.requests) == 1
+    assert fake.last.url.path == "/rest/v1/rpc/enrollment_status"
+    assert fake.last.headers["Content-Profile"] == "dev_nexus"
+    assert json.loads(fake.last.content) == {"eid": "enr1"}
+
+async def test_get_enrollment_status_unknown_when_rpc_returns_nothing():
+    repo = repo_with_mock(FakePostgrest((200, [])))
+    status = await repo.get_enrollment_status("missing")
+    assert status.computed == "unknown" and not status.has_outcome
+
+async def test_get_enrollment_status_falls_back_to_selects():
+    bodies = {
+        "/rest/v1/rpc/enrollment_status": None,                        # function not deployed
+        "/rest/v1/enrollment": [{"id": "enr1", "status": "active"}],  # enrollment -> active
+        "/rest/v1/outcome": [],                                        # outcome none
+        "/rest/v1/handoff": [{"id": "h1"}],                            # handoff exists
+    }
+    # Lookups run concurrently, so answer by path rather than by call order
+    repo = repo_with_mock(
+        lambda req: httpx.Response(404, json={}) if bodies[req.url.path] is None
+        else httpx.Response(200, json=bodies[req.url.path])
+    )
+    status = await repo.get_enrollment_status("enr1")
     assert status.computed == "handoff"
 
-def test_link_ref_to_workflow_uses_event_upsert():
-    s = MagicMock()
-    s.post.return_value = Resp(200, [{"id": "e2", "type": "link"}])
-    repo = repo_with_mock(s)
+async def test_link_ref_to_workflow_uses_event_upsert():
+    fake = FakePostgrest((200, [{"id": "e2", "type": "link"}]))
+    repo = repo_with_mock(fake)
 
     dto = LinkRefDTO(provider_ref="r3", workflow_id="wf-123", project_id=None)
-    out = repo.link_ref_to_workflow(dto)
+    out = await repo.link_ref_to_workflow(dto)
 
     assert out["id"] == "e2"
     # verify it routed through /event (UPSERT)
-    path = s.post.call_args[0][0]
-    assert path.endswith("/rest/v1/event")
-    params = s.post.call_args[1]["params"]
-    assert params["on_conflict"] == "provider_ref,direction"
+    assert fake.last.url.path.endswith("/rest/v1/event")
+    assert fake.last.url.params["on_conflict"] == "provider_ref,direction"
 
-def test_retries_on_500():
-    s = MagicMock()
+async def test_retries_on_500():
     # Two server errors, then success
-    s.request.side_effect = [
-        Resp(500, {"err": "boom"}),
-        Resp(503, {"err": "busy"}),
-        Resp(200, [{"id": "x"}]),
-    ]
-    repo = repo_with_mock(s)
-    out = repo._request("GET", "/rest/v1/message", params={"select": "id"})
+    fake = FakePostgrest(
+        (500, {"err": "boom"}),
+        (503, {"err": "busy"}),
+        (200, [{"id": "x"}]),
+    )
+    repo = repo_with_mock(fake)
+    out = await repo._request("GET", "/rest/v1/message", params={"select": "id"})
     assert out.status_code == 200
+    assert len(fake.requests) == 3
+
+async def test_retry_honors_retry_after(monkeypatch):
+    slept = []
+
+    async def fake_sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr("app.repo.supabase_repo.asyncio.sleep", fake_sleep)
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "2"}, json={}),
+        httpx.Response(500, json={}),
+        httpx.Response(200, json=[]),
+    ])
+    repo = repo_with_mock(lambda req: next(responses))
+    await repo._request("GET", "/rest/v1/message")
+
+    assert slept[0] == 2.0
+    # jittered delay stays within [base, cap]
+    assert repo.cfg.base_backoff_seconds <= slept[1] <= repo.cfg.max_backoff_seconds
+
+async def test_concurrent_upserts_coalesce_into_one_post():
+    import asyncio
+
+    def echo(req: httpx.Request) -> httpx.Response:
+        rows = json.loads(req.content)
+        return httpx.Response(201, json=[{**r, "id": f"id-{r['provider_ref']}"} for r in rows])
+
+    calls = []
+    repo = repo_with_mock(lambda req: calls.append(req) or echo(req))
+    dtos = [MessageDTO(provider_ref=f"r{i}", direction="outbound") for i in range(5)]
+    dtos.append(MessageDTO(provider_ref="r0", direction="outbound", payload={"b": 2}))  # same key
+
+    out = await asyncio.gather(*(repo.log_outbound(d) for d in dtos))
+
+    assert len(calls) == 1
+    assert len(json.loads(calls[0].content)) == 5
+    assert [o["id"] for o in out] == ["id-r0", "id-r1", "id-r2", "id-r3", "id-r4", "id-r0"]
+
+async def test_concurrent_upserts_with_different_optional_fields_post_per_key_set():
+    import asyncio
+
+    def strict(req: httpx.Request) -> httpx.Response:
+        rows = json.loads(req.content)
+        if len({frozenset(r) for r in rows}) > 1:  # PostgREST PGRST102
+            return httpx.Response(400, json={"code": "PGRST102", "message": "All object keys must match"})
+        return httpx.Response(201, json=[{**r, "id": f"id-{r['provider_ref']}"} for r in rows])
+
+    calls = []
+    repo = repo_with_mock(lambda req: calls.append(req) or strict(req))
+    dtos = [
+        MessageDTO(provider_ref="a", direction="outbound"),
+        MessageDTO(provider_ref="b", direction="outbound", project_id="p1"),
+        MessageDTO(provider_ref="c", direction="outbound"),
+    ]
+
+    out = await asyncio.gather(*(repo.log_outbound(d) for d in dtos))
+
+    assert [o["id"] for o in out] == ["id-a", "id-b", "id-c"]
+    assert sorted(len(json.loads(c.content)) for c in calls) == [1, 2]
+
+async def test_lone_upsert_is_sent_without_linger():
+    import asyncio
+
+    def echo(req: httpx.Request) -> httpx.Response:
+        return httpx.Response(201, json=[{**r, "id": "id-1"} for r in json.loads(req.content)])
+
+    repo = repo_with_mock(echo)
+    repo.cfg.upsert_linger_seconds = 5.0
+
+    out = await asyncio.wait_for(repo.log_outbound(MessageDTO(provider_ref="r1", direction="outbound")), 1.0)
+    assert out["id"] == "id-1"
+
+async def test_aclose_fails_in_flight_and_queued_upserts():
+    import asyncio
+
+    started = asyncio.Event()
+
+    async def stall(req: httpx.Request) -> httpx.Response:
+        started.set()
+        await asyncio.Event().wait()
+
+    repo = repo_with_mock(stall)
+    in_flight = asyncio.ensure_future(repo.log_outbound(MessageDTO(provider_ref="r1", direction="outbound")))
+    await started.wait()
+    queued = asyncio.ensure_future(repo.log_outbound(MessageDTO(provider_ref="r2", direction="outbound")))
+    await asyncio.sleep(0)
+
+    await repo.aclose()
+
+    for fut in (in_flight, queued):
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(fut, 1.0)
@@ -19,3 +19,13 @@ def test_healthz_status_and_request_id():
     # Header validation
     request_id = response.headers.get("X-Request-Id")
     assert request_id is not None and len(request_id) > 0, "X-Request-Id header missing or empty"
+
+
+def test_no_route_is_registered_twice():
+    """Only the first of two routes with the same method+path is ever reachable."""
+    seen = set()
+    for route in app.routes:
+        for method in getattr(route, "methods", None) or ():
+            key = (method, route.path)
+            assert key not in seen, f"duplicate route {key}"
+            seen.add(key)
@@ -29,3 +29,37 @@ def test_edge_idempotency_duplicate():
     assert r2.status_code == 200
     assert r2.json().get("status") == "duplicate"
     assert app.state.processed_refs.count(provider_ref) == 1
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = (value, ex)
+        return True
+
+    async def delete(self, key):
+        return int(self.store.pop(key, None) is not None)
+
+
+async def test_idempotency_cache_reserves_via_redis_setnx():
+    from app.web.idempotency_cache import IdempotencyCache
+
+    redis = _FakeRedis()
+    cache = IdempotencyCache(ttl_seconds=300, redis=redis)
+
+    assert (await cache.reserve("ref-1"), await cache.reserve("ref-1")) == (True, False)
+    assert redis.store == {"idemp:ref-1": ("1", 300)}
+    assert len(cache) == 0  # nothing held in-process
+
+
+async def test_idempotency_cache_release_allows_reserve_again():
+    from app.web.idempotency_cache import IdempotencyCache
+
+    for cache in (IdempotencyCache(ttl_seconds=300), IdempotencyCache(ttl_seconds=300, redis=_FakeRedis())):
+        assert await cache.reserve("ref-1")
+        await cache.release("ref-1")
+        assert (await cache.reserve("ref-1"), await cache.reserve("ref-1")) == (True, False)
@@ -31,3 +31,37 @@ def test_kpi_route_ok():
     assert isinstance(body["latency_p95"], list)
     assert isinstance(body["deliverability"], list)
     assert isinstance(body["response_by_variant"], list)
+
+def test_kpi_route_serves_cached_result_within_ttl(monkeypatch):
+    calls = []
+
+    class CountingSb(FakeSb):
+        def rpc(self, name, _):
+            calls.append(name)
+            return super().rpc(name, _)
+
+    monkeypatch.setattr(routes_kpi, "_sb", CountingSb())
+    monkeypatch.setattr(routes_kpi, "_cache", {"ts": 0.0, "val": None})
+    c = TestClient(app)
+    r1 = c.get("/api/v1/kpi")
+    r2 = c.get("/api/v1/kpi")
+    assert r1.json() == r2.json()
+    assert len(calls) == 3  # one RPC triple for both requests
+    assert r2.headers["Cache-Control"].startswith("public, max-age=")
+
+def test_kpi_route_uses_shared_http_pool(monkeypatch):
+    import httpx
+
+    paths = []
+
+    def handler(req: httpx.Request) -> httpx.Response:
+        paths.append(req.url.path)
+        return httpx.Response(200, json=[{"rpc": req.url.path.rsplit("/", 1)[-1]}])
+
+    http = httpx.AsyncClient(base_url="https://sb.test/rest/v1", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(routes_kpi, "_sb", None)
+    monkeypatch.setattr(routes_kpi, "_cache", {"ts": 0.0, "val": None})
+    monkeypatch.setattr(app.state, "http", http, raising=False)
+    body = TestClient(app).get("/api/v1/kpi").json()
+    assert sorted(paths) == sorted(f"/rest/v1/rpc/{n}" for n in routes_kpi._KPI_RPCS)
+    assert body["deliverability"] == [{"rpc": "rpc_kpi_deliverability"}]
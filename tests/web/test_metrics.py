@@ -18,3 +18,15 @@ def test_readyz_endpoint():
     assert r.status_code == 200
     data = r.json()
     assert data["status"] == "ready"
+
+
+def test_unknown_methods_share_one_metrics_label():
+    """Arbitrary method tokens must not mint new webhook_total series."""
+    from app.web import middleware
+
+    for method in ("FOO", "BAR", "X-SCAN"):
+        client.request(method, "/nope")
+
+    keys = [k for k in middleware._TOTAL_CHILDREN if k[1] == middleware._UNMATCHED]
+    assert ("FOO", middleware._UNMATCHED) not in keys
+    assert ("OTHER", middleware._UNMATCHED) in keys
@@ -8,6 +8,7 @@ from app.web.schemas import (
     SmsWebhookEvent,
     VoiceWebhookEvent,
     normalize_webhook_event,
+    normalize_webhook_event_json,
 )
 
 @pytest.fixture(scope="session")
@@ -47,3 +48,21 @@ def test_examples_round_trip(examples, key):
     dumped = event.model_dump()
     for field in ["event", "channel", "timestamp"]:
         assert field in dumped
+
+def test_normalize_webhook_event_json_infers_channel_model():
+    raw = json.dumps({
+        "event": "Email_Opened",
+        "timestamp": "2025-10-06T12:00:00Z",
+        "payload": {"to": "a@b.co", "subject": "Hi"},
+    }).encode()
+    event = normalize_webhook_event_json(raw)
+    assert isinstance(event, EmailWebhookEvent)
+    assert event.event == "email_opened"
+
+def test_workflow_id_resolution_order():
+    base = {"event": "x", "channel": "webhook", "timestamp": "2025-10-06T12:00:00Z"}
+    event = normalize_webhook_event({**base, "metadata": {"workflow_id": ""}, "payload": {"workflow_id": "wf-1"}})
+    assert event.workflow_id == "wf-1"
+    assert "workflow_id" not in event.model_dump()
+    assert event.model_copy(update={"payload": {}}).workflow_id == "default-workflow"
+    assert normalize_webhook_event(base).workflow_id == "default-workflow"
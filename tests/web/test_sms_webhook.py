@@ -34,3 +34,113 @@ def test_sms_webhook_duplicate_noop():
     r2 = client.post("/webhooks/sms", json=payload, headers={"x-signature": sig})
     assert r2.status_code == 200
     assert r2.json()["status"] == "duplicate"
+
+async def test_sms_classification_updates_step_with_one_rpc(monkeypatch):
+    import app.web.sms_webhook as sw
+    from app.agents.conversational_response_agent import ConversationalResponseAgent
+
+    calls = []
+
+    class FakeSb:
+        def rpc(self, name, params):
+            calls.append((name, params))
+            return self
+        def execute(self):
+            return None
+        def table(self, name):
+            raise AssertionError("no table round trips expected")
+
+    async def fake_classify(self, text, channel="sms"):
+        return {"intent": "interested", "next_action": "schedule_call"}
+
+    monkeypatch.setattr(sw, "supabase", FakeSb())
+    monkeypatch.setattr(ConversationalResponseAgent, "classify_message", fake_classify)
+
+    out = await sw._classify_and_update_campaign_step(
+        inbound_text="sounds good, tell me more", from_number="+15551234567")
+
+    assert out["intent"] == "interested"
+    assert calls == [("sms_classify_update", {
+        "p_phone": "+15551234567", "p_intent": "interested", "p_next": "schedule_call"})]
+
+async def test_log_inbound_message_caches_contact_not_enrollment(monkeypatch):
+    import app.web.sms_webhook as sw
+
+    tables = []
+
+    class Query:
+        def __init__(self, name): self.name = name
+        def __getattr__(self, _): return lambda *a, **k: self
+        def execute(self):
+            data = {"contact": [{"id": "c1", "project_id": "p1"}], "enrollment": [{"id": "e1"}]}
+            return type("Res", (), {"data": data.get(self.name, [])})()
+
+    class FakeSb:
+        def table(self, name):
+            tables.append(name)
+            return Query(name)
+
+    monkeypatch.setattr(sw, "supabase", FakeSb())
+    monkeypatch.setattr(sw, "_PHONE_CACHE", {})
+
+    await sw.log_inbound_message("+15550001111", "hi", "ref-1")
+    await sw.log_inbound_message("+15550001111", "again", "ref-2")
+
+    # contact is cached; the enrollment is looked up again for every message
+    assert tables == ["contact", "enrollment", "message", "enrollment", "message"]
+
+async def test_sms_quick_reply_skips_agent(monkeypatch):
+    import app.web.sms_webhook as sw
+    from app.agents.conversational_response_agent import ConversationalResponseAgent
+
+    class FakeSb:
+        def rpc(self, name, params): return self
+        def execute(self): return None
+
+    async def boom(self, text, channel="sms"):
+        raise AssertionError("agent should not be called")
+
+    monkeypatch.setattr(sw, "supabase", FakeSb())
+    monkeypatch.setattr(ConversationalResponseAgent, "classify_message", boom)
+
+    out = await sw._classify_and_update_campaign_step(inbound_text=" No! ", from_number="+15551234567")
+    assert out == {"intent": "not_interested", "next_action": "stop_outreach"}
+
+def test_sms_hmac_rejects_non_canonical_hex():
+    import app.web.sms_webhook as sw
+
+    body, ts, nonce = b'{"a":1}', "1700000000", "n1"
+    sig = hmac.new(SECRET.encode(), f"{ts}.{nonce}.".encode() + body, hashlib.sha256).hexdigest()
+    assert sw.verify_hmac_signature(body, sig, ts, nonce)
+    assert not sw.verify_hmac_signature(body, sig.upper(), ts, nonce)
+    assert not sw.verify_hmac_signature(body, " ".join([sig[:32], sig[32:]]), ts, nonce)
+
+def test_sms_stop_retry_reapplies_consent_after_failed_write(monkeypatch):
+    import app.web.sms_webhook as sw
+
+    calls = []
+
+    async def flaky_opt_in(phone, opted_in, now):
+        calls.append((phone, opted_in))
+        if len(calls) == 1:
+            raise RuntimeError("supabase down")
+
+    async def noop_record(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(sw, "set_sms_opt_in", flaky_opt_in)
+    monkeypatch.setattr(sw, "_record_inbound", noop_record)
+
+    payload = {"message_id": "stop-retry-001", "from": "+15551234567", "message": "STOP"}
+    body = json.dumps(payload).encode()
+    ts, nonce = "1700000000", "n-stop"
+    sig = hmac.new(SECRET.encode(), f"{ts}.{nonce}.".encode() + body, hashlib.sha256).hexdigest()
+    headers = {"x-signature": sig, "x-timestamp": ts, "x-nonce": nonce, "content-type": "application/json"}
+
+    failing = TestClient(app, raise_server_exceptions=False)
+    r1 = failing.post("/webhooks/sms", content=body, headers=headers)
+    r2 = failing.post("/webhooks/sms", content=body, headers=headers)
+
+    assert r1.status_code == 500
+    assert r2.json() == {"status": "STOP applied"}
+    assert calls == [("+15551234567", False), ("+15551234567", False)]
@@ -14,7 +14,7 @@ def test_email_webhook_happy_path():
     payload = {"provider_ref": "em-001", "subject": "Hello", "from": "user@example.com"}
     sig = sign_payload(payload)
     r = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
-    assert r.status_code == 200
+    assert r.status_code == 202
     body = r.json()
     assert body["status"] == "received"
     assert body["provider_ref"] == "em-001"
@@ -31,10 +31,74 @@ def test_email_webhook_duplicate_idempotency():
 
     # First request
     r1 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
-    assert r1.status_code == 200
+    assert r1.status_code == 202
     assert r1.json()["status"] == "received"
 
     # Duplicate
     r2 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
     assert r2.status_code == 200
     assert r2.json()["status"] == "duplicate"
+
+async def test_email_classification_updates_step_with_one_rpc(monkeypatch):
+    import httpx
+    import app.web.email_webhook as ew
+    from app.agents.conversational_response_agent import ConversationalResponseAgent
+
+    calls = []
+
+    def handler(req: httpx.Request) -> httpx.Response:
+        calls.append(req)
+        return httpx.Response(200, json="step-1")
+
+    async def fake_classify(self, text, channel="sms"):
+        return {"intent": "interested", "next_action": "schedule_call"}
+
+    monkeypatch.setattr(ew, "supabase_http", httpx.AsyncClient(
+        base_url="https://example.supabase.co/rest/v1", transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(ConversationalResponseAgent, "classify_message", fake_classify)
+
+    out = await ew._classify_and_update_campaign_step_email(
+        inbound_text="yes please", from_email="user@example.com")
+
+    assert out["intent"] == "interested"
+    assert len(calls) == 1
+    assert calls[0].url.path == "/rest/v1/rpc/update_latest_step_by_email"
+    assert json.loads(calls[0].content) == {
+        "email": "user@example.com", "intent": "interested", "next_action": "schedule_call"}
+
+def test_email_webhook_duplicate_header_ref_skips_body():
+    payload = {"provider_ref": "em-hdr", "subject": "Retry"}
+    sig = sign_payload(payload)
+    r1 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
+    assert r1.status_code == 202
+
+    # Retry carrying the ref in a header short-circuits before signature checks
+    r2 = client.post("/webhooks/email", content=b"not json",
+                     headers={"x-signature": "whatever", "X-Provider-Ref": "em-hdr"})
+    assert r2.status_code == 200
+    assert r2.json() == {"status": "duplicate", "provider_ref": "em-hdr"}
+
+    # An unseen header ref gets no shortcut: signature is still enforced
+    r3 = client.post("/webhooks/email", content=b"{}",
+                     headers={"x-signature": "bad", "X-Provider-Ref": "em-new"})
+    assert r3.status_code == 401
+
+def test_email_webhook_failed_dispatch_lets_redelivery_through(monkeypatch):
+    calls = []
+
+    async def flaky_process(channel, event):
+        calls.append(event.metadata["provider_ref"])
+        if len(calls) == 1:
+            raise RuntimeError("temporal down")
+
+    monkeypatch.setattr(app.state, "process_event_fn", flaky_process)
+    payload = {"provider_ref": "em-retry", "subject": "Hello"}
+    sig = sign_payload(payload)
+
+    r1 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
+    r2 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
+    r3 = client.post("/webhooks/email", json=payload, headers={"x-signature": sig})
+
+    assert (r1.status_code, r2.status_code) == (202, 202)
+    assert r3.json()["status"] == "duplicate"
+    assert calls == ["em-retry", "em-retry"]